@@ -0,0 +1,123 @@
+"""
+Captcha matcher micro-benchmark - compares the original per-call keyword scan
+with the compiled matcher in captcha_detect.py on realistic OwO embeds.
+
+Run: python bench/bench_captcha.py
+"""
+import os
+import re
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import captcha_detect  # noqa: E402
+from parsed_message import ParsedMessage  # noqa: E402
+
+
+MESSAGES = [
+    {
+        "id": "1180000000000000001",
+        "edited_timestamp": None,
+        "content": "**🌱 | Farmer**, hunt is empowered by <:egem3:510366792000000000> `[324/450]` "
+                   "<:mgem1:510366792000000001> `[10/75]` <:rgem4:510366792000000002> `[33/50]` !\n"
+                   "**<:blank:427371936482328596> |** You found: <:common:416520037713838081> "
+                   "<:bee:417131839087722496> <:uncommon:416520056269176842> <:pig:417132001805950976>",
+        "embeds": [],
+    },
+    {
+        "id": "1180000000000000002",
+        "edited_timestamp": None,
+        "content": "",
+        "embeds": [{
+            "title": "Farmer's Inventory",
+            "description": "`051`<:cgem1:492572122514063371>⁰⁵ `052`<:ugem1:492572122761527318>⁰²\n"
+                           "`058`<:cgem2:492572122266599424>¹² `065`<:cgem3:492572122795081739>⁰⁷\n"
+                           "`072`<:cgem4:492572122409074698>⁰¹ `079`<:cgem5:492572122350223360>⁰³",
+            "author": {"name": "Farmer's Inventory"},
+        }],
+    },
+    {
+        "id": "1180000000000000003",
+        "edited_timestamp": None,
+        "content": "Farmer, you caught a lot today! Remember to vote for daily rewards.",
+        "embeds": [],
+    },
+    {
+        "id": "1180000000000000004",
+        "edited_timestamp": None,
+        "content": "<@1234567890>",
+        "embeds": [{
+            "title": "⚠️ Are you a real human?",
+            "description": "Please complete your captcha to verify that you are human! (1/5)\n"
+                           "Please use the link below so I can check! Please complete this "
+                           "within 10 minutes or it may result in a ban!",
+            "fields": [{"name": "Link", "value": "https://owobot.com/captcha"}],
+            "author": {"name": "Farmer"},
+        }],
+    },
+]
+
+
+def _legacy_normalize_text(value):
+    if not value:
+        return ""
+    normalized = unicodedata.normalize("NFKD", value)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    normalized = re.sub(r"[\u200b-\u200f\u2060\ufeff]", "", normalized)
+    normalized = re.sub(r"\s+", " ", normalized)
+    return normalized.lower().strip()
+
+
+def legacy_is_captcha(msg):
+    """The baseline per-message logic, without its debug prints"""
+    content = _legacy_normalize_text(msg.get('content', ''))
+    for embed in msg.get('embeds') or []:
+        content += ' ' + _legacy_normalize_text(embed.get('description', ''))
+        content += ' ' + _legacy_normalize_text(embed.get('title', ''))
+        for field in embed.get('fields', []):
+            content += ' ' + _legacy_normalize_text(field.get('name', ''))
+            content += ' ' + _legacy_normalize_text(field.get('value', ''))
+        content += ' ' + _legacy_normalize_text(embed.get('author', {}).get('name', ''))
+    captcha_keywords = [
+        'captcha', 'verify', 'verification', 'are you a real human',
+        'verify that you are human', 'please complete your captcha',
+        'please complete this within 10 minutes',
+        'please complete this within 120 minutes', 'owobot.com/captcha',
+    ]
+    return any(keyword in content for keyword in captcha_keywords)
+
+
+def uncached_is_captcha(msg):
+    """New matcher with memoization defeated (cold path): parse, normalize, match"""
+    captcha_detect._MATCH_CACHE.clear()
+    return captcha_detect.is_captcha_message(ParsedMessage(msg))
+
+
+_PARSED = {msg["id"]: ParsedMessage(msg) for msg in MESSAGES}
+
+
+def memoized_is_captcha(msg):
+    """New matcher on an already parsed message, as polled from the snapshot buffer"""
+    return captcha_detect.is_captcha_message(_PARSED[msg["id"]])
+
+
+def _bench(label, func, number):
+    for msg in MESSAGES:
+        assert func(msg) == legacy_is_captcha(msg), msg["id"]
+    seconds = timeit.timeit(lambda: [func(msg) for msg in MESSAGES], number=number)
+    per_message = seconds / (number * len(MESSAGES)) * 1e6
+    print(f"{label:<28} {per_message:8.2f} us/message")
+    return per_message
+
+
+def main(number=5000):
+    legacy = _bench("legacy keyword scan", legacy_is_captcha, number)
+    cold = _bench("compiled matcher (cold)", uncached_is_captcha, number)
+    warm = _bench("compiled matcher (memoized)", memoized_is_captcha, number)
+    print(f"speedup cold: {legacy / cold:.1f}x, memoized: {legacy / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
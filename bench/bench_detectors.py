@@ -0,0 +1,123 @@
+"""
+Detector benchmark suite - replays recorded channel fixtures through
+check_for_captcha, check_active_gems and parse_gems_from_inventory, then
+runs a few bot iterations end to end against the local Discord stand-in.
+
+Run: python bench/bench_detectors.py [fixture.jsonl ...]
+(defaults to every file in bench/fixtures/)
+"""
+import glob
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import captcha_detect  # noqa: E402
+import gem_detect  # noqa: E402
+from discord_stub import StandInDiscord  # noqa: E402
+from initialization import DiscordClient  # noqa: E402
+from message_cache import ChannelSnapshot, SNAPSHOT_LIMIT  # noqa: E402
+from parsed_message import ParsedMessage  # noqa: E402
+from recorder import load_fixture  # noqa: E402
+
+
+class ReplayChannel:
+    """Duck-typed ChannelSnapshot serving a fixed newest-first window"""
+
+    status_code = 200
+    error_text = None
+
+    def __init__(self):
+        self.window = []
+
+    def messages(self, limit=None):
+        return self.window if limit is None else self.window[:limit]
+
+
+def _windows(messages, size=SNAPSHOT_LIMIT):
+    """Every newest-first window a live poller would have seen, one message at a time"""
+    for end in range(1, len(messages) + 1):
+        yield list(reversed(messages[max(0, end - size):end]))
+
+
+def _time_per_call(func, inputs, repeat=3):
+    """Best-of-repeat mean seconds per call over inputs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            func(item)
+        elapsed = (time.perf_counter() - start) / max(1, len(inputs))
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_fixture(path):
+    raw_messages = load_fixture(path)
+    build = _time_per_call(ParsedMessage, raw_messages)
+    messages = [ParsedMessage(msg) for msg in raw_messages]
+    windows = list(_windows(messages))
+    channel = ReplayChannel()
+
+    def run_captcha(window):
+        channel.window = window
+        return captcha_detect.check_for_captcha(channel)
+
+    def run_gems(window):
+        channel.window = window
+        return gem_detect.check_active_gems(channel)
+
+    inventories = [text for text in map(gem_detect._inventory_text, messages) if text]
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        captcha_detect._MATCH_CACHE.clear()
+        captcha_cold = _time_per_call(run_captcha, windows, repeat=1)
+        captcha_warm = _time_per_call(run_captcha, windows)
+        gems = _time_per_call(run_gems, windows)
+        parse = _time_per_call(gem_detect.parse_gems_from_inventory, inventories)
+        detections = sum(bool(run_captcha(window)) for window in windows)
+
+    print(f"{os.path.basename(path)}: {len(messages)} messages, {len(inventories)} inventories, "
+          f"{detections} captcha windows")
+    print(f"  ParsedMessage build        {build * 1e6:9.1f} us/message")
+    print(f"  check_for_captcha          {captcha_cold * 1e6:9.1f} us/poll (cold) "
+          f"{captcha_warm * 1e6:9.1f} us/poll (memoized)")
+    print(f"  check_active_gems          {gems * 1e6:9.1f} us/poll")
+    if inventories:
+        print(f"  parse_gems_from_inventory  {parse * 1e6:9.1f} us/inventory")
+
+
+def bench_end_to_end(path, iterations=5):
+    """Drive captcha check, gem check and inventory fetch over HTTP against the stand-in"""
+    with StandInDiscord(channel_id="1", messages=load_fixture(path)[:-2]) as stub:
+        client = DiscordClient("token", base_url=stub.base_url)
+        channel = ChannelSnapshot(client)
+        inventory = gem_detect.InventoryCache(channel)
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            for _ in range(iterations):
+                channel.refresh()
+                captcha_detect.check_for_captcha(channel)
+                active = gem_detect.check_active_gems(channel)
+                inventory.gems(gem_detect.get_inactive_gem_types(active))
+                for command in ("oh", "ob", "owo"):
+                    channel.send_message(command)
+        elapsed = time.perf_counter() - start
+        client.close()
+    print(f"end to end: {iterations} iterations, {stub.requests['GET']} GETs, "
+          f"{stub.requests['POST']} POSTs, {elapsed / iterations * 1e3:.1f} ms/iteration")
+
+
+def main(paths):
+    paths = paths or sorted(glob.glob(os.path.join(BENCH_DIR, "fixtures", "*.jsonl")))
+    for path in paths:
+        bench_fixture(path)
+    if paths:
+        bench_end_to_end(paths[0])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,106 @@
+"""
+Inventory parser benchmark - compares the original regex-and-range-scan parser
+with the lookup-table parser in gem_detect.py on large inventory texts.
+
+Run: python bench/bench_gems.py
+"""
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from initialization import GEM_TYPES  # noqa: E402
+import gem_detect  # noqa: E402
+
+
+_SUPERSCRIPT = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+# Inventory texts and the counts they must parse to
+CASES = [
+    ("`051`<:cgem1:492572122514063371>⁰⁵ `052`<:ugem1:492572122761527318>⁰²", {51: 5, 52: 2}),
+    ("051 ❤️ 27 052 💙 3", {51: 27, 52: 3}),
+    # An entry without a count must not take the next entry's ID as its count
+    ("051 ❤️ 052 💙 3", {51: 1, 52: 3}),
+    ("051 ❤️ 052 💙", {51: 1, 52: 1}),
+]
+
+
+def make_inventory(items, plain=False, seed=7):
+    """Build an inventory text with `items` entries.
+
+    The default is OwO's embed layout (`051`<:emoji:id>⁰⁵); ``plain`` uses the
+    "051 ❤️ 27" layout where counts are ordinary digits.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for index in range(items):
+        item_id = rng.randint(1, 300)
+        count = str(rng.randint(1, 99))
+        if plain:
+            lines.append(f"{item_id:03d} ❤️ {count}")
+        else:
+            emoji = f"<:item{item_id}:{rng.randint(10**17, 10**18 - 1)}>"
+            lines.append(f"`{item_id:03d}`{emoji}{count.translate(_SUPERSCRIPT)}")
+        if index % 4 == 3:
+            lines.append("\n")
+    return " ".join(lines)
+
+
+def legacy_parse_gems_from_inventory(inventory_text):
+    """The baseline parser: every 2-3 digit number checked against every range"""
+    if not inventory_text:
+        return []
+    gems = re.findall(r'\b(0?[0-9]{2,3})\b', inventory_text)
+    valid_gems = []
+    for g in gems:
+        gem_id = int(g)
+        for gem_range in GEM_TYPES.values():
+            if gem_id in gem_range:
+                valid_gems.append(gem_id)
+                break
+    return sorted(list(set(valid_gems)))
+
+
+def legacy_select(available_gems, inactive_types):
+    selected_gems = []
+    for gem_type in inactive_types:
+        type_gems = [g for g in available_gems if g in GEM_TYPES[gem_type]]
+        if type_gems:
+            selected_gems.append(max(type_gems))
+    return sorted(selected_gems)
+
+
+def check_cases():
+    for text, expected in CASES:
+        parsed = gem_detect.parse_gems_from_inventory(text)
+        assert parsed == expected, f"{text!r}: {parsed} != {expected}"
+    print(f"parser cases: {len(CASES)} ok")
+
+
+def main(number=200):
+    check_cases()
+    inactive = list(GEM_TYPES)
+    for items, plain in ((50, False), (500, False), (5000, False), (500, True)):
+        text = make_inventory(items, plain)
+        legacy_ids = legacy_parse_gems_from_inventory(text)
+        parsed = gem_detect.parse_gems_from_inventory(text)
+
+        legacy = timeit.timeit(lambda: legacy_parse_gems_from_inventory(text), number=number)
+        new = timeit.timeit(lambda: gem_detect.parse_gems_from_inventory(text), number=number)
+        legacy_sel = timeit.timeit(lambda: legacy_select(legacy_ids, inactive), number=number)
+        new_sel = timeit.timeit(lambda: gem_detect.select_gems_to_use(parsed, inactive), number=number)
+
+        layout = "plain" if plain else "embed"
+        print(f"{items:>5} {layout} items  parse: legacy {legacy / number * 1e3:7.3f} ms, "
+              f"table {new / number * 1e3:7.3f} ms ({legacy / new:4.1f}x)  "
+              f"select: {legacy_sel / new_sel:4.1f}x")
+        spurious = sorted(set(legacy_ids) - set(parsed))
+        if spurious:
+            print(f"       legacy parser took counts for gem IDs: {spurious}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Rate limit check - drives DiscordClient against a local stub server that
+enforces a Discord-style bucket, and compares it with bare session calls.
+
+The stub allows BUCKET_LIMIT requests per BUCKET_WINDOW seconds, reports
+X-RateLimit-* headers on every response and answers 429 with Retry-After.
+
+Run: python bench/bench_rate_limit.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import requests  # noqa: E402
+
+from initialization import DiscordClient  # noqa: E402
+
+
+BUCKET_LIMIT = 5
+BUCKET_WINDOW = 1.0
+
+
+class BucketStub(BaseHTTPRequestHandler):
+    """Single-bucket Discord stand-in: counts accepted and rejected requests"""
+
+    lock = threading.Lock()
+    window_start = 0.0
+    used = 0
+    accepted = 0
+    rejected = 0
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.window_start = time.monotonic()
+            cls.used = cls.accepted = cls.rejected = 0
+
+    def _respond(self, payload):
+        cls = type(self)
+        with cls.lock:
+            now = time.monotonic()
+            if now - cls.window_start >= BUCKET_WINDOW:
+                cls.window_start, cls.used = now, 0
+            reset_after = BUCKET_WINDOW - (now - cls.window_start)
+            if cls.used >= BUCKET_LIMIT:
+                cls.rejected += 1
+                status = 429
+                body = {"message": "You are being rate limited.", "retry_after": reset_after, "global": False}
+            else:
+                cls.used += 1
+                cls.accepted += 1
+                status = 200
+                body = payload
+            remaining = BUCKET_LIMIT - cls.used
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-RateLimit-Bucket", "messages-bucket")
+        self.send_header("X-RateLimit-Limit", str(BUCKET_LIMIT))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset-After", f"{reset_after:.3f}")
+        if status == 429:
+            self.send_header("Retry-After", f"{reset_after:.3f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._respond([])
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond({"id": "1"})
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, send, requests_to_send):
+    BucketStub.reset()
+    start = time.monotonic()
+    statuses = [send().status_code for _ in range(requests_to_send)]
+    elapsed = time.monotonic() - start
+    print(f"{label:<22} sent {requests_to_send}, server accepted {BucketStub.accepted}, "
+          f"rejected {BucketStub.rejected}, final non-200: {sum(s != 200 for s in statuses)}, "
+          f"{elapsed:.2f}s")
+    return BucketStub.rejected, statuses
+
+
+def main(requests_to_send=20):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BucketStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v9/channels/0/messages"
+    try:
+        session = requests.Session()
+        naive_rejected, _ = run("bare session", lambda: session.get(url), requests_to_send)
+
+        client = DiscordClient("token", base_url=url)
+        rejected, statuses = run("DiscordClient", lambda: client.get_messages(limit=1), requests_to_send)
+        assert all(status == 200 for status in statuses), "dispatcher let a 429 through"
+        assert rejected <= 1, f"dispatcher sent {rejected} requests into an exhausted bucket"
+
+        # Without bucket headers to go on, a 429 must still be retried after Retry-After
+        client = DiscordClient("token", base_url=url)
+        BucketStub.reset()
+        BucketStub.used = BUCKET_LIMIT
+        start = time.monotonic()
+        response = client.get_messages(limit=1)
+        assert response.status_code == 200 and time.monotonic() - start >= BUCKET_WINDOW * 0.9
+        print(f"429 retry honored Retry-After ({time.monotonic() - start:.2f}s); "
+              f"bare session wasted {naive_rejected} rejected requests")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Fault injection check - runs the real main loop on a virtual clock against the
+in-process Discord stand-in while requests randomly stall, drop or return 5xx,
+with a full outage in the middle of the run.
+
+Checks that every request carries a timeout (a stall costs at most the read
+timeout), and reports retries, timeouts and failures per operation, how long
+the circuit breaker paused the loop and how many requests were sent during
+the outage.
+
+Run: python bench/bench_retry.py [--hours 6] [--fault-rate 0.05] [--outage 120]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import requests  # noqa: E402
+
+import clock  # noqa: E402
+import log  # noqa: E402
+import main as bot  # noqa: E402
+from discord_stub import StandInDiscord, StubResponse, StubSession  # noqa: E402
+from gem_detect import ActiveGems, InventoryCache  # noqa: E402
+from initialization import DiscordClient  # noqa: E402
+from message_cache import ChannelSnapshot  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from scheduler import BreakSchedule  # noqa: E402
+
+
+class FlakySession(StubSession):
+    """StubSession that fails a share of requests and everything during an outage"""
+
+    def __init__(self, stub, latency, fault_rate, outage, rng):
+        super().__init__(stub, latency)
+        self.fault_rate = fault_rate
+        self.outage = outage  # (start, end) clock times
+        self.rng = rng
+        self.outage_requests = 0
+        self.max_stall = 0.0
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        timeout = kwargs.get("timeout")
+        assert timeout, f"{method} sent without a timeout"
+        now = clock.now()
+        if self.outage[0] <= now < self.outage[1]:
+            self.outage_requests += 1
+            clock.CLOCK.advance(timeout[0])
+            raise requests.exceptions.ConnectTimeout("outage")
+
+        roll = self.rng.random()
+        if roll < self.fault_rate / 3:
+            # Stalled connection: costs the read timeout, nothing more
+            self.max_stall = max(self.max_stall, timeout[1])
+            clock.CLOCK.advance(timeout[1])
+            raise requests.exceptions.ReadTimeout("stalled")
+        if roll < self.fault_rate * 2 / 3:
+            clock.CLOCK.advance(self.latency)
+            raise requests.exceptions.ConnectionError("connection reset")
+        if roll < self.fault_rate:
+            clock.CLOCK.advance(self.latency)
+            return StubResponse(503, {"message": "Service unavailable"})
+        return super().request(method, url, params=params, json=json, **kwargs)
+
+
+def simulate(hours, fault_rate, outage_minutes, seed=1, latency=0.15):
+    previous = clock.set_clock(clock.VirtualClock())
+    METRICS.configure(path="", prom_path="")
+    METRICS.reset()
+    try:
+        stub = StandInDiscord(channel_id="1")
+        start = clock.now() + hours * 3600 / 2
+        session = FlakySession(stub, latency, fault_rate, (start, start + outage_minutes * 60),
+                               random.Random(seed))
+        client = DiscordClient("token", base_url="stub://messages", session=session, rng=random.Random(seed))
+        channel = ChannelSnapshot(client)
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            log.setup(stream=devnull)
+            bot.run(channel, InventoryCache(channel), BreakSchedule(random.Random(seed)), ActiveGems(),
+                    until=clock.now() + hours * 3600)
+        return METRICS.snapshot(), stub, session
+    finally:
+        clock.set_clock(previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hours", type=float, default=6.0)
+    parser.add_argument("--fault-rate", type=float, default=0.05, help="share of requests that fail")
+    parser.add_argument("--outage", type=float, default=120.0, help="minutes of total outage mid-run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    wall_start = time.perf_counter()
+    snapshot, stub, session = simulate(args.hours, args.fault_rate, args.outage, args.seed)
+    print(f"simulated {args.hours:g}h in {time.perf_counter() - wall_start:.2f}s wall time, "
+          f"fault rate {args.fault_rate:.0%}, {args.outage:g} min outage")
+    print(f"{'operation':<16} {'requests':>8} {'timeouts':>8} {'retries':>8} {'failures':>8}")
+    for endpoint, entry in sorted(snapshot["requests"].items()):
+        failures = snapshot["request_failures"].get(endpoint, {})
+        print(f"{endpoint:<16} {entry['count']:8d} {failures.get('timeouts', 0):8d} "
+              f"{failures.get('retries', 0):8d} {failures.get('failures', 0):8d}")
+    hunts = sum(1 for msg in stub.messages if msg["content"] == "oh")
+    sleeps = snapshot["sleep_seconds"]
+    print(f"hunts sent: {hunts}, longest stall: {session.max_stall:g}s")
+    print(f"requests during outage: {session.outage_requests}, "
+          f"circuit pauses: {sleeps.get('circuit_open', 0) / 60:.1f} min, "
+          f"error waits: {sleeps.get('error_wait', 0) / 60:.1f} min, "
+          f"retry backoff: {sleeps.get('retry_backoff', 0):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Startup benchmark - times a cold start the way the cron workflow pays it: a
+fresh interpreter importing the bot, loading config, building the client and
+getting the first response from a local Discord stand-in.
+
+Also checks that importing the bot has no side effects: it must work without
+any config and must not import optional notification backends.
+
+Run: python bench/bench_startup.py [--runs 7] [--max-ms 1000]
+(exits 1 if the median time to the first response exceeds --max-ms)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from discord_stub import StandInDiscord  # noqa: E402
+
+
+# Runs inside a fresh interpreter; prints phase timings (ms since interpreter start) as JSON
+PROBE = r"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+imported = time.perf_counter()
+from initialization import create_client, load_config
+config = load_config()
+client = create_client(config)
+ready = time.perf_counter()
+response = client.get_messages(limit=1)
+first = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    "import": (imported - start) * 1e3,
+    "config_and_client": (ready - imported) * 1e3,
+    "first_request": (first - ready) * 1e3,
+    "total": (first - start) * 1e3,
+    "optional_modules": sorted(set(sys.modules) & {"plyer", "winsound"}),
+}))
+"""
+
+# Importing with no config at all must neither exit nor pull in optional backends
+IMPORT_CHECK = r"""
+import sys
+sys.path.insert(0, sys.argv[1])
+import main, recorder, captcha_detect, gem_detect, notify
+print(sorted(set(sys.modules) & {"plyer", "winsound"}))
+"""
+
+
+def _run(code, env):
+    result = subprocess.run([sys.executable, "-c", code, SRC_DIR], env=env,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise SystemExit(f"probe failed ({result.returncode}):\n{result.stdout}{result.stderr}")
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="fail above this median total")
+    args = parser.parse_args()
+
+    bare_env = {key: value for key, value in os.environ.items()
+                if key not in ("CHANNEL_ID", "CHANNEL_URL", "DISCORD_TOKEN")}
+    bare_env["PYTHONDONTWRITEBYTECODE"] = "1"
+    leaked = _run(IMPORT_CHECK, bare_env)
+    print(f"import without config: ok, optional backends imported: {leaked}")
+
+    with StandInDiscord(channel_id="1") as stub:
+        env = dict(bare_env, CHANNEL_ID="1", CHANNEL_URL="http://localhost", DISCORD_TOKEN="token",
+                   DISCORD_API_URL=stub.api_url, STATE_FILE="", METRICS_FILE="")
+        env.pop("PYTHONDONTWRITEBYTECODE")
+        _run(PROBE, env)  # warm the bytecode cache, like a second cron run
+        samples = [json.loads(_run(PROBE, env)) for _ in range(args.runs)]
+
+    for phase in ("import", "config_and_client", "first_request", "total"):
+        values = [sample[phase] for sample in samples]
+        print(f"  {phase:<18} median {statistics.median(values):7.1f} ms   max {max(values):7.1f} ms")
+    optional = sorted({name for sample in samples for name in sample["optional_modules"]})
+    if optional:
+        print(f"optional backends imported at startup: {optional}")
+
+    median_total = statistics.median(sample["total"] for sample in samples)
+    if median_total > args.max_ms or leaked != "[]" or optional:
+        print(f"FAIL: startup {median_total:.1f} ms (limit {args.max_ms:g} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+Local Discord stand-in - serves /api/v9/channels/{id}/messages the way Config.messages_url
+expects and answers posted commands with scripted OwO replies.
+
+Use from Python (see StandInDiscord) or run the bot against it:
+
+    python bench/discord_stub.py --port 8765 --captcha-after 20 &
+    DISCORD_API_URL=http://127.0.0.1:8765/api/v9 CHANNEL_ID=1 \\
+        CHANNEL_URL=http://localhost DISCORD_TOKEN=x python src/main.py
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import clock  # noqa: E402
+from recorder import load_fixture  # noqa: E402
+
+
+OWO_AUTHOR = {"id": "408785106942164992", "username": "OwO", "bot": True}
+USER_AUTHOR = {"id": "100000000000000001", "username": "Farmer", "bot": False}
+
+# 2023-11-15 in Discord snowflake terms; IDs only need to grow
+FIRST_SNOWFLAKE = 1174000000000000000
+SNOWFLAKE_STEP = 1 << 22
+
+# Hunts a freshly used gem lasts in the stand-in
+GEM_HUNTS = 150
+
+DEFAULT_INVENTORY = (
+    "`050`<:lootbox:427019823747301377>²³ `051`<:cgem1:492572122514063371>⁰⁵ "
+    "`052`<:ugem1:492572122761527318>⁰² `053`<:rgem1:492572122719322132>⁰¹\n"
+    "`058`<:cgem2:492572122266599424>¹² `059`<:ugem2:492572122618789899>⁰³ "
+    "`065`<:cgem3:492572122795081739>⁰⁷ `066`<:ugem3:492572122702544906>⁰¹\n"
+    "`072`<:cgem4:492572122409074698>⁰¹ `079`<:cgem5:492572122350223360>⁰³ "
+    "`100`<:crate:523771259302182922>⁰⁴"
+)
+
+_MESSAGES_PATH_RE = re.compile(r"^/api/v9/channels/(\d+)/messages$")
+_GEM_ID_RE = re.compile(r"\b(\d{2,3})\b")
+
+
+class StandInDiscord:
+    """In-process fake of one Discord channel with an OwO bot behind it.
+
+    ``messages`` may seed the channel (e.g. from a recorded fixture).
+    ``captcha_after`` makes the bot answer the N-th posted command with a
+    captcha, after which every command gets the captcha again until
+    ``solve_captcha()`` is called. ``reply_delay`` delays bot replies to
+    exercise reply waiting. ``requests`` counts GETs and POSTs served.
+    """
+
+    def __init__(self, channel_id="1", messages=(), captcha_after=None,
+                 empowered=("egem3", "mgem1"), inventory_text=DEFAULT_INVENTORY, reply_delay=0.0):
+        self.channel_id = str(channel_id)
+        self.messages = sorted(messages, key=lambda msg: int(msg["id"]))
+        self.captcha_after = captcha_after
+        self.captcha_active = False
+        # gem emoji name -> hunts left; seeded gems start part-used
+        self.empowered = {gem: GEM_HUNTS // 4 for gem in empowered}
+        self.inventory_text = inventory_text
+        self.reply_delay = reply_delay
+        self.commands_seen = 0
+        self.requests = {"GET": 0, "POST": 0}
+        self.lock = threading.Lock()
+        last_id = int(self.messages[-1]["id"]) if self.messages else FIRST_SNOWFLAKE
+        self._next_id = last_id + SNOWFLAKE_STEP
+        self._server = None
+
+    # ----- channel model -----
+
+    def _new_id(self):
+        message_id = self._next_id
+        self._next_id += SNOWFLAKE_STEP
+        return str(message_id)
+
+    def add_message(self, content="", embeds=(), author=OWO_AUTHOR):
+        """Append a message to the channel and return it"""
+        with self.lock:
+            msg = {
+                "id": self._new_id(),
+                "channel_id": self.channel_id,
+                "author": dict(author),
+                "content": content,
+                "embeds": [dict(embed) for embed in embeds],
+                "edited_timestamp": None,
+            }
+            self.messages.append(msg)
+        return msg
+
+    def list_messages(self, limit=50, after=None, before=None):
+        """Newest-first page of messages, with Discord's limit/after/before semantics"""
+        limit = max(1, min(int(limit), 100))
+        with self.lock:
+            messages = self.messages
+            if before is not None:
+                messages = [msg for msg in messages if int(msg["id"]) < int(before)]
+            if after is not None:
+                page = [msg for msg in messages if int(msg["id"]) > int(after)][:limit]
+            else:
+                page = messages[-limit:]
+        return list(reversed(page))
+
+    def solve_captcha(self):
+        self.captcha_active = False
+        self.add_message("👍 | **Farmer**, I have verified that you are human! Thank you! :3")
+
+    # ----- scripted bot -----
+
+    def _captcha_embed(self):
+        return {
+            "title": "⚠️ Are you a real human?",
+            "description": "Please complete your captcha to verify that you are human! (1/5)\n"
+                           "Please complete this within 10 minutes or it may result in a ban!",
+            "fields": [{"name": "Link", "value": "https://owobot.com/captcha"}],
+            "author": {"name": "Farmer"},
+        }
+
+    def _reply(self, command):
+        """Post the OwO bot's answer to a command"""
+        self.commands_seen += 1
+        if self.captcha_after is not None and self.commands_seen >= self.captcha_after:
+            self.captcha_active = True
+        if self.captcha_active:
+            self.add_message("<@100000000000000001>", [self._captcha_embed()])
+            return
+
+        word = command.split()[0].lower() if command.split() else ""
+        if word in ("oh", "ohunt", "owoh"):
+            # Each hunt uses one charge of every active gem; spent gems drop off after this reply
+            for gem in self.empowered:
+                self.empowered[gem] -= 1
+            gems = " ".join(f"<:{gem}:510366792000000000> `[{left}/{GEM_HUNTS}]`"
+                            for gem, left in self.empowered.items())
+            self.empowered = {gem: left for gem, left in self.empowered.items() if left > 0}
+            empowered = f"hunt is empowered by {gems} !\n" if gems else ""
+            self.add_message(
+                f"**🌱 | Farmer**, {empowered}"
+                "**<:blank:427371936482328596> |** You found: <:common:416520037713838081> "
+                "<:bee:417131839087722496> <:uncommon:416520056269176842> <:pig:417132001805950976>"
+            )
+        elif word in ("ob", "obattle"):
+            self.add_message("", [{
+                "title": "Farmer goes into battle!",
+                "description": "Your team gained 200 xp! Streak: 12",
+                "author": {"name": "Farmer goes into battle!"},
+            }])
+        elif word == "owo":
+            self.add_message("OwO what's this? **Farmer**, you gained 1 cowoncy!")
+        elif word in ("oinv", "oinventory"):
+            self.add_message("", [{
+                "title": "Farmer's Inventory",
+                "description": self.inventory_text,
+                "author": {"name": "Farmer's Inventory"},
+            }])
+        elif word == "ouse":
+            used = [int(gem_id) for gem_id in _GEM_ID_RE.findall(command)]
+            for gem_id in used:
+                gem_type = (gem_id - 51) // 7 + 1
+                if not any(gem.endswith(f"gem{gem_type}") for gem in self.empowered):
+                    self.empowered[f"cgem{gem_type}"] = GEM_HUNTS
+            self.add_message(f"🔷 | **Farmer**, you activated gem(s) {', '.join(f'{g:03d}' for g in used)}!")
+
+    def post(self, content):
+        """Handle a posted command: store it, schedule the bot reply, return the message"""
+        msg = self.add_message(content, author=USER_AUTHOR)
+        if self.reply_delay > 0:
+            threading.Timer(self.reply_delay, self._reply, args=(content,)).start()
+        else:
+            self._reply(content)
+        return msg
+
+    # ----- HTTP -----
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                url = urlparse(self.path)
+                match = _MESSAGES_PATH_RE.match(url.path)
+                if not match or match.group(1) != stub.channel_id:
+                    self._send(404, {"message": "Unknown Channel", "code": 10003})
+                    return None
+                return parse_qs(url.query)
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests["GET"] += 1
+                query = self._route()
+                if query is None:
+                    return
+                first = lambda name: query[name][0] if name in query else None
+                self._send(200, stub.list_messages(first("limit") or 50, first("after"), first("before")))
+
+            def do_POST(self):
+                with stub.lock:
+                    stub.requests["POST"] += 1
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self._route() is None:
+                    return
+                content = json.loads(body or b"{}").get("content", "")
+                self._send(200, stub.post(content))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, port=0):
+        """Serve in a background thread; returns the messages URL to use as base_url"""
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/v9"
+
+    @property
+    def base_url(self):
+        return f"{self.api_url}/channels/{self.channel_id}/messages"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubResponse:
+    """Just enough of requests.Response for the bot's code paths"""
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body
+
+    @property
+    def text(self):
+        return json.dumps(self._body)
+
+    def json(self):
+        return self._body
+
+
+class StubSession:
+    """In-process stand-in for requests.Session, talking to a StandInDiscord.
+
+    Pass it as DiscordClient(session=...) to run the real client, rate
+    limiter and metrics without HTTP. Each request advances the installed
+    clock by ``latency`` when it is a VirtualClock, to model network time.
+    """
+
+    def __init__(self, stub, latency=0.0):
+        self.stub = stub
+        self.latency = latency
+        self.headers = {}
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        if isinstance(clock.CLOCK, clock.VirtualClock):
+            clock.CLOCK.advance(self.latency)
+        with self.stub.lock:
+            self.stub.requests[method] += 1
+        if method == "GET":
+            params = params or {}
+            return StubResponse(200, self.stub.list_messages(
+                params.get("limit", 50), params.get("after"), params.get("before")))
+        return StubResponse(200, self.stub.post((json or {}).get("content", "")))
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Discord stand-in for the bot")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--channel-id", default="1")
+    parser.add_argument("--fixture", help="JSONL fixture to seed the channel with")
+    parser.add_argument("--captcha-after", type=int, help="answer the N-th command with a captcha")
+    parser.add_argument("--reply-delay", type=float, default=0.0, help="seconds before bot replies")
+    args = parser.parse_args()
+
+    stub = StandInDiscord(
+        channel_id=args.channel_id,
+        messages=load_fixture(args.fixture) if args.fixture else (),
+        captcha_after=args.captcha_after,
+        reply_delay=args.reply_delay,
+    )
+    stub.start(args.port)
+    print(f"Serving {stub.base_url} (DISCORD_API_URL={stub.api_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
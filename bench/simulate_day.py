@@ -0,0 +1,105 @@
+"""
+Accelerated simulation - runs the real main loop on a virtual clock against an
+in-process Discord stand-in, so a full day of cadence finishes in seconds.
+
+Reports requests issued per endpoint, commands posted, active gem checks, and how the simulated
+time split between each kind of wait and active work.
+
+Run: python bench/simulate_day.py [--hours 24] [--seed 1] [--latency 0.15] [--captcha-after N]
+                                  [--engine sync|async]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import async_engine  # noqa: E402
+import clock  # noqa: E402
+import log  # noqa: E402
+import main as bot  # noqa: E402
+from discord_stub import StandInDiscord, StubSession  # noqa: E402
+from gem_detect import ActiveGems, InventoryCache  # noqa: E402
+from initialization import DiscordClient  # noqa: E402
+from message_cache import ChannelSnapshot  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from scheduler import BreakSchedule  # noqa: E402
+
+
+def _run_async(channel, inventory, schedule, active_gems, until):
+    async def go():
+        async_channel = async_engine.AsyncChannel(channel, async_engine.ThreadedTransport(channel.client))
+        await async_engine.run(async_channel, inventory, schedule, active_gems, async_engine.Waiter(), until=until)
+    asyncio.run(go())
+
+
+def simulate(hours=24.0, seed=1, latency=0.15, captcha_after=None, engine="sync"):
+    """Run the bot loop for `hours` of virtual time; returns (metrics snapshot, stub)"""
+    previous = clock.set_clock(clock.VirtualClock())
+    METRICS.configure(path="", prom_path="")
+    METRICS.reset()
+    try:
+        stub = StandInDiscord(channel_id="1", captcha_after=captcha_after)
+        client = DiscordClient("token", base_url="stub://messages", session=StubSession(stub, latency))
+        channel = ChannelSnapshot(client)
+        inventory = InventoryCache(channel)
+        run = _run_async if engine == "async" else bot.run
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            log.setup(stream=devnull)
+            run(channel, inventory, BreakSchedule(random.Random(seed)), ActiveGems(),
+                until=clock.now() + hours * 3600)
+        return METRICS.snapshot(), stub
+    finally:
+        clock.set_clock(previous)
+
+
+def _hms(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:3d}h {seconds % 3600 // 60:02d}m {seconds % 60:02d}s"
+
+
+def report(snapshot, stub, wall_seconds):
+    uptime = snapshot["uptime_seconds"]
+    print(f"simulated {_hms(uptime)} in {wall_seconds:.2f}s wall time")
+    print("requests by endpoint:")
+    for endpoint, entry in sorted(snapshot["requests"].items()):
+        print(f"  {endpoint:<16} {entry['count']:6d}")
+    print(f"  {'total':<16} {sum(e['count'] for e in snapshot['requests'].values()):6d} "
+          f"({stub.requests['GET']} GET, {stub.requests['POST']} POST)")
+
+    commands = {}
+    for msg in stub.messages:
+        if not msg["author"].get("bot") and msg["content"]:
+            word = msg["content"].split()[0]
+            commands[word] = commands.get(word, 0) + 1
+    print("commands posted: " + ", ".join(f"{word} {count}" for word, count in sorted(commands.items())))
+    gem_checks = snapshot["timings"].get("gem_parse", {}).get("count", 0)
+    print(f"active gem checks: {gem_checks} over {commands.get('oh', 0)} hunts")
+
+    print("time split:")
+    for category, seconds in sorted(snapshot["sleep_seconds"].items()):
+        print(f"  {category:<16} {_hms(seconds)}  {seconds / uptime:6.1%}")
+    print(f"  {'active':<16} {_hms(snapshot['active_seconds'])}  {snapshot['active_seconds'] / uptime:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.15, help="simulated seconds per request")
+    parser.add_argument("--captcha-after", type=int, help="stand-in answers the N-th command with a captcha")
+    parser.add_argument("--engine", choices=("sync", "async"), default="sync", help="main loop or asyncio engine")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot, stub = simulate(args.hours, args.seed, args.latency, args.captcha_after, args.engine)
+    report(snapshot, stub, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
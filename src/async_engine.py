@@ -0,0 +1,276 @@
+"""
+Async engine module - optional asyncio driver for the bot loop, alongside main.main()
+
+Same cadence, detectors and state as the synchronous loop, but waits are
+cancellable (SIGINT/SIGTERM end a break right away and shut down cleanly,
+SIGUSR1 skips the current wait) and the captcha and active-gem checks run
+concurrently on one shared channel read.
+
+Run: python src/async_engine.py
+"""
+import asyncio
+import signal
+
+import requests
+
+import clock
+import log
+import metrics
+import notify
+from metrics import METRICS
+
+import main as bot
+from captcha_detect import CaptchaPause, check_for_captcha, notify_captcha
+from gem_detect import check_gem_lifetimes
+from initialization import CAPTCHA_MAX_WAIT_MINUTES
+
+
+class ThreadedTransport:
+    """Async transport over a DiscordClient.
+
+    Each call runs the blocking client on a worker thread, so rate limiting,
+    retries, the circuit breaker and metrics behave exactly as in the
+    synchronous loop while the event loop stays free. The metrics operation
+    label travels with the call (asyncio.to_thread copies the context).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get_messages(self, limit=None, after=None):
+        return await asyncio.to_thread(self.client.get_messages, limit=limit, after=after)
+
+    async def send_message(self, content):
+        return await asyncio.to_thread(self.client.send_message, content)
+
+    def close(self):
+        self.client.close()
+
+
+class SnapshotView:
+    """Read-only view of a ChannelSnapshot that never fetches, for the detectors"""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    @property
+    def status_code(self):
+        return self._snapshot.status_code
+
+    @property
+    def error_text(self):
+        return self._snapshot.error_text
+
+    def messages(self, limit=None):
+        return self._snapshot.cached(limit)
+
+
+class AsyncChannel:
+    """Async front of a ChannelSnapshot.
+
+    Reads go through the transport and are folded into the same snapshot the
+    synchronous code uses. Concurrent callers share one in-flight refresh, so
+    checks running side by side still cost a single GET.
+    """
+
+    def __init__(self, snapshot, transport):
+        self.snapshot = snapshot
+        self.transport = transport
+        self._refreshing = None
+
+    @property
+    def client(self):
+        return self.snapshot.client
+
+    async def refresh(self):
+        """Fetch new messages, joining a refresh that is already running"""
+        task = self._refreshing
+        if task is None:
+            task = self._refreshing = asyncio.ensure_future(self._refresh())
+            task.add_done_callback(self._refresh_done)
+        await asyncio.shield(task)
+
+    def _refresh_done(self, task):
+        if self._refreshing is task:
+            self._refreshing = None
+
+    async def _refresh(self):
+        while not self.snapshot.apply(await self.transport.get_messages(**self.snapshot.fetch_params())):
+            pass
+
+    async def view(self):
+        """A SnapshotView, refreshed first if the snapshot is stale"""
+        if not self.snapshot.is_fresh():
+            await self.refresh()
+        return SnapshotView(self.snapshot)
+
+    async def send_message(self, content):
+        response = await self.transport.send_message(content)
+        self.snapshot.invalidate()
+        return response
+
+
+class Waiter:
+    """Timed waits that end early when stop() or wake() is called"""
+
+    def __init__(self):
+        self.stopping = False
+        self._event = asyncio.Event()
+
+    def stop(self):
+        """End the current wait and every later one (shutdown)"""
+        self.stopping = True
+        self._event.set()
+
+    def wake(self):
+        """End the current wait only"""
+        self._event.set()
+
+    async def sleep(self, category, seconds):
+        """Wait up to seconds, accounted to a sleep category; returns False if stopping"""
+        start = METRICS.clock()
+        if not self._event.is_set():
+            await clock.async_sleep(seconds, wake=self._event)
+        if not self.stopping:
+            self._event.clear()
+        METRICS.record_sleep(category, METRICS.clock() - start)
+        METRICS.maybe_flush()
+        return not self.stopping
+
+
+async def send_command(channel, message):
+    """Send a command message to Discord"""
+    with metrics.operation("send"):
+        return await channel.send_message(message)
+
+
+async def captcha_check(channel):
+    with metrics.operation("captcha_check"):
+        view = await channel.view()
+    return check_for_captcha(view)
+
+
+async def gem_check(channel, active_gems):
+    """Read active gem lifetimes if a check is due; returns (due, lifetimes or None if the read failed)"""
+    if not active_gems.check_due():
+        return False, None
+    with metrics.operation("gem_check"):
+        view = await channel.view()
+    return True, check_gem_lifetimes(view)
+
+
+async def wait_for_captcha_resolution(channel, waiter, max_wait_minutes=CAPTCHA_MAX_WAIT_MINUTES):
+    """Async counterpart of captcha_detect.wait_for_captcha_resolution; False on timeout or shutdown"""
+    pause = CaptchaPause(max_wait_minutes)
+    while True:
+        if not await waiter.sleep("captcha_pause", pause.next_wait()):
+            return False
+        error = None
+        try:
+            with metrics.operation("captcha_check"):
+                await channel.refresh()
+        except requests.RequestException as e:
+            error = e
+        resolved = pause.check(SnapshotView(channel.snapshot), error)
+        if resolved is not None:
+            return resolved
+
+
+async def run_iteration(channel, inventory, active_gems, waiter):
+    """One pass of the loop (see main.run_iteration); returns False if no farming commands were sent"""
+    # Independent read-only checks side by side; they share one refresh
+    captcha, (gem_due, lifetimes) = await asyncio.gather(captcha_check(channel), gem_check(channel, active_gems))
+    if captcha:
+        notify_captcha()
+        log.warning("⚠️  CAPTCHA DETECTED! Pausing requests until captcha is resolved...")
+        log.dump("captcha")
+        if await wait_for_captcha_resolution(channel, waiter) or waiter.stopping:
+            return False
+        # Timed out: resume anyway, with a gem check on the channel as it is now
+        gem_due, lifetimes = await gem_check(channel, active_gems)
+
+    if gem_due:
+        # May sync the inventory (oinv + reply wait); run the blocking path off the loop
+        await asyncio.to_thread(bot.activate_gems, channel.snapshot, inventory, active_gems, lifetimes)
+        # That can take up to the reply deadline; don't farm past a shutdown requested meanwhile
+        if waiter.stopping:
+            return False
+
+    log.debug("Sending farming commands...")
+    await send_command(channel, "oh")
+    active_gems.record_hunt()
+    await send_command(channel, "ob")
+    await send_command(channel, "owo")
+    return True
+
+
+async def run(channel, inventory, schedule, active_gems, waiter, until=None, checkpoint=None):
+    """Run the loop until clock.now() reaches until (forever if None) or waiter.stop() is called.
+
+    The checkpoint is saved before each iteration's waits, so a shutdown
+    mid-break resumes the rest of that break on the next start.
+    """
+    log.info("Bot started (asyncio engine)." if until is not None else
+             "Bot started (asyncio engine). Running until stopped...")
+    while not waiter.stopping and (until is None or clock.now() < until):
+        METRICS.maybe_flush()
+        try:
+            if not await run_iteration(channel, inventory, active_gems, waiter):
+                continue
+        except requests.RequestException as e:
+            category, wait_time = bot.failure_wait(channel, e)
+            bot.announce_break(category, wait_time)
+            await waiter.sleep(category, wait_time)
+            continue
+
+        waits = schedule.finish_iteration()
+        log.debug("Messages sent: %d", schedule.riel_count)
+        if checkpoint is not None:
+            checkpoint.save(resume_at=clock.now() + sum(wait_time for _, wait_time in waits))
+        for category, wait_time in waits:
+            bot.announce_break(category, wait_time)
+            if not await waiter.sleep(category, wait_time):
+                break
+
+
+def install_signal_handlers(waiter):
+    """SIGINT/SIGTERM stop the bot, SIGUSR1 skips the current wait (where supported)"""
+    loop = asyncio.get_running_loop()
+    handlers = [("SIGINT", waiter.stop), ("SIGTERM", waiter.stop), ("SIGUSR1", waiter.wake)]
+    for name, handler in handlers:
+        sig = getattr(signal, name, None)
+        if sig is None:
+            continue
+        try:
+            loop.add_signal_handler(sig, handler)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows event loops
+
+
+async def async_main():
+    """Main bot loop on the asyncio engine"""
+    snapshot, inventory, schedule, active_gems, checkpoint, resume_at = bot.prepare()
+    channel = AsyncChannel(snapshot, ThreadedTransport(snapshot.client))
+    waiter = Waiter()
+    install_signal_handlers(waiter)
+    try:
+        if resume_at is not None:
+            wait_time = int(resume_at - clock.now())
+            bot.announce_break("resume_wait", wait_time)
+            await waiter.sleep("resume_wait", wait_time)
+        await run(channel, inventory, schedule, active_gems, waiter, checkpoint=checkpoint)
+        if waiter.stopping:
+            log.info("Shutting down...")
+    finally:
+        channel.transport.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(async_main())
+    except Exception:
+        log.exception("Bot stopped on an unexpected error")
+        raise
+    finally:
+        notify.shutdown()
+        METRICS.flush()
@@ -2,142 +2,165 @@
 Captcha detection module - handles captcha detection and alerts
 """
 import re
-import time
-import unicodedata
+
 import requests
-from initialization import HAS_WINSOUND, HAS_PLYER, BASE_URL, get_headers
 
+import clock
+import log
+import metrics
+import notify
+from initialization import (
+    CAPTCHA_POLL_MIN, CAPTCHA_POLL_MAX, CAPTCHA_FAST_POLLS, CAPTCHA_MAX_WAIT_MINUTES
+)
+
+
+CAPTCHA_KEYWORDS = (
+    'captcha',
+    'verify',
+    'verification',
+    'are you a real human',
+    'verify that you are human',
+    'please complete your captcha',
+    'please complete this within 10 minutes',
+    'please complete this within 120 minutes',
+    'owobot.com/captcha',
+)
 
-_ZERO_WIDTH_RE = re.compile(r"[\u200b-\u200f\u2060\ufeff]")
+# All keywords in one pass; longest first so the reported match is the most specific
+_CAPTCHA_RE = re.compile("|".join(
+    re.escape(keyword) for keyword in sorted(CAPTCHA_KEYWORDS, key=len, reverse=True)
+))
 
+# Captcha verdicts keyed by (message id, edited_timestamp)
+_MATCH_CACHE = {}
+_MATCH_CACHE_SIZE = 512
 
-def _normalize_text(value: str) -> str:
-    """Normalize text to improve keyword matching across obfuscated messages."""
-    if not value:
-        return ""
-    # Unicode normalize and strip combining marks
-    normalized = unicodedata.normalize("NFKD", value)
-    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
-    # Remove zero-width chars and collapse whitespace
-    normalized = _ZERO_WIDTH_RE.sub("", normalized)
-    normalized = re.sub(r"\s+", " ", normalized)
-    return normalized.lower().strip()
 
+def is_captcha_message(msg):
+    """Return True if a ParsedMessage looks like a captcha challenge.
+
+    Verdicts are memoized by message ID and edit timestamp, so repeated polls
+    of an unchanged message skip normalization entirely.
+    """
+    key = (msg.id, msg.edited_timestamp)
+    if msg.id is not None and key in _MATCH_CACHE:
+        return _MATCH_CACHE[key]
 
-def check_for_captcha(token):
+    match = _CAPTCHA_RE.search(msg.text)
+    if match:
+        log.debug("Captcha message detected (%r): %s", match.group(0), msg.raw_text)
+
+    if msg.id is not None:
+        if len(_MATCH_CACHE) >= _MATCH_CACHE_SIZE:
+            _MATCH_CACHE.clear()
+        _MATCH_CACHE[key] = match is not None
+    return match is not None
+
+
+def check_for_captcha(channel):
     """Check if bot is asking for captcha verification"""
-    response = requests.get(BASE_URL + "?limit=1", headers=get_headers(token))
-    print(f"DEBUG: Captcha check status={response.status_code}")
-    if response.status_code != 200:
-        print(f"DEBUG: Captcha check error body={response.text}")
-    if response.status_code == 200:
-        messages = response.json()
-        print(f"DEBUG: Captcha check messages={len(messages)}")
-        for msg in messages:
-            raw_parts = [msg.get('content', '')]
-            content = _normalize_text(msg.get('content', ''))
-            # Check embeds too
-            if 'embeds' in msg and msg['embeds']:
-                for embed in msg['embeds']:
-                    description = _normalize_text(embed.get('description', ''))
-                    title = _normalize_text(embed.get('title', ''))
-                    raw_parts.append(embed.get('description', ''))
-                    raw_parts.append(embed.get('title', ''))
-                    content += ' ' + description + ' ' + title
-                    # Include embed fields and author text if present
-                    for field in embed.get('fields', []):
-                        content += ' ' + _normalize_text(field.get('name', ''))
-                        content += ' ' + _normalize_text(field.get('value', ''))
-                        raw_parts.append(field.get('name', ''))
-                        raw_parts.append(field.get('value', ''))
-                    author = embed.get('author', {})
-                    content += ' ' + _normalize_text(author.get('name', ''))
-                    raw_parts.append(author.get('name', ''))
-
-                    raw_message = " ".join(part for part in raw_parts if part)
-                    print(f"DEBUG: Message content: {raw_message}")
-            
-            # Check for captcha keywords
-            captcha_keywords = [
-                'captcha',
-                'verify',
-                'verification',
-                'are you a real human',
-                'verify that you are human',
-                'please complete your captcha',
-                'please complete this within 10 minutes',
-                'please complete this within 120 minutes',
-                'owobot.com/captcha'
-            ]
-            if any(keyword in content for keyword in captcha_keywords):
-                print(f"DEBUG: Captcha message detected: {raw_message}")
-                return True
+    with metrics.operation("captcha_check"):
+        messages = channel.messages(limit=1)
+    if channel.status_code == 200:
+        log.debug("Captcha check status=200 messages=%d", len(messages))
+        with metrics.timed("captcha_parse"):
+            return any(is_captcha_message(msg) for msg in messages)
+    log.warning("Captcha check failed: status=%s body=%s", channel.status_code, channel.error_text)
     return False
 
 
 def notify_captcha():
-    """Send notification alert for captcha"""
-    # Play alert sound - 3 beeps
-    if HAS_WINSOUND:
-        for i in range(3):
-            import winsound
-            winsound.Beep(1000, 500)  # 1000 Hz for 500ms
-            time.sleep(0.3)
-    
-    # Try to show notification using plyer
-    if HAS_PLYER:
-        try:
-            from plyer import notification
-            notification.notify(
-                title='⚠️ CAPTCHA DETECTED',
-                message='OwO Bot requires captcha verification!\nPlease check Discord.',
-                app_name='OwO Bot',
-                timeout=10
-            )
-        except:
-            pass
-    
-    # Always print to console as fallback
-    print("\n" + "="*50)
-    print("⚠️  CAPTCHA ALERT! ⚠️" * 3)
-    print("="*50 + "\n")
+    """Queue a captcha alert on the notification backends (returns immediately)"""
+    queued = notify.get_dispatcher().notify(
+        "captcha",
+        '⚠️ CAPTCHA DETECTED',
+        'OwO Bot requires captcha verification!\nPlease check Discord.'
+    )
+    # Console fallback, once per alert
+    if queued:
+        log.warning("⚠️  CAPTCHA ALERT! ⚠️")
 
 
+def captcha_poll_schedule(first=CAPTCHA_POLL_MIN, cap=CAPTCHA_POLL_MAX, fast_polls=CAPTCHA_FAST_POLLS):
+    """Yield seconds to wait between captcha checks.
 
-def wait_for_captcha_resolution(token, max_wait_minutes=60*24):
-    """Wait for captcha to be resolved, then resume
-    
-    Args:
-        token: Discord token for API requests
-        max_wait_minutes: Maximum time to wait before resuming anyway (default 30 min)
+    The first ``fast_polls`` checks use ``first`` so a quickly solved captcha
+    resumes fast; after that the interval doubles up to ``cap``.
     """
-    start_time = time.time()
-    max_wait_seconds = max_wait_minutes * 360 
-    check_interval = 30  # Check every 30 seconds
-    
-    print(f"\n⏳ PAUSED: Waiting for captcha to be resolved...")
-    print(f"Will resume automatically in {max_wait_minutes} minutes if not resolved.")
-    print(f"Complete the captcha in Discord to resume immediately.\n")
-    
+    for _ in range(fast_polls):
+        yield first
+    interval = first
     while True:
-        elapsed = time.time() - start_time
-        
-        # Check if captcha is still there
-        if not check_for_captcha(token):
+        interval = min(interval * 2, cap)
+        yield interval
+
+
+class CaptchaPause:
+    """One captcha pause: the poll schedule, the deadline and the resolved/timeout
+    verdicts, shared by both engines (they only differ in how they sleep and refresh).
+
+    Call ``next_wait()`` and sleep that long, refresh the channel, then
+    ``check(channel)``: True once resolved, False on timeout, None to keep waiting.
+    A refresh that raised is passed as ``error`` and only counts towards the timeout.
+    """
+
+    def __init__(self, max_wait_minutes=CAPTCHA_MAX_WAIT_MINUTES):
+        self.max_wait_minutes = max_wait_minutes
+        self.max_wait_seconds = max_wait_minutes * 60
+        self.start_time = clock.now()
+        self._intervals = captcha_poll_schedule()
+        log.warning("⏳ PAUSED: Waiting for captcha to be resolved...")
+        log.info("Will resume automatically in %d minutes if not resolved.", max_wait_minutes)
+        log.info("Complete the captcha in Discord to resume immediately.")
+
+    def next_wait(self):
+        """Seconds to wait before the next check, never past the deadline"""
+        remaining = self.max_wait_seconds - (clock.now() - self.start_time)
+        return max(0, min(next(self._intervals), remaining))
+
+    def check(self, channel, error=None):
+        """Judge a freshly refreshed channel (see class docstring)"""
+        elapsed = clock.now() - self.start_time
+        # A failed read proves nothing; only a successful one without a captcha resumes
+        if error is not None:
+            log.warning("Captcha check failed: %s", error)
+        elif channel.status_code == 200 and not check_for_captcha(channel):
             elapsed_minutes = int(elapsed // 60)
             elapsed_seconds = int(elapsed % 60)
-            print(f"\n✅ CAPTCHA RESOLVED! (waited {elapsed_minutes}m {elapsed_seconds}s)")
-            print("Resuming requests...\n")
-            break
-        
+            log.info("✅ CAPTCHA RESOLVED! (waited %dm %ds) Resuming requests...", elapsed_minutes, elapsed_seconds)
+            notify.get_dispatcher().clear("captcha")
+            return True
+
         # Check if max wait time exceeded
-        if elapsed >= max_wait_seconds:
-            print(f"\n⏱️  TIMEOUT: {max_wait_minutes} minutes reached. Resuming anyway...")
-            print("(You may still need to complete the captcha)\n")
-            break
-        
-        # Wait before next check
-        remaining = max_wait_seconds - elapsed
-        remaining_minutes = int(remaining // 60)
-        print(f"Captcha still active... ({remaining_minutes}m remaining) ", end='\r')
-        time.sleep(check_interval)
+        if elapsed >= self.max_wait_seconds:
+            log.warning("⏱️  TIMEOUT: %d minutes reached. Resuming anyway... "
+                        "(You may still need to complete the captcha)", self.max_wait_minutes)
+            return False
+
+        remaining_minutes = int((self.max_wait_seconds - elapsed) // 60)
+        log.debug("Captcha still active... (%dm remaining)", remaining_minutes)
+        return None
+
+
+def wait_for_captcha_resolution(channel, max_wait_minutes=CAPTCHA_MAX_WAIT_MINUTES):
+    """Wait for captcha to be resolved, then resume
+    
+    Args:
+        channel: ChannelSnapshot used to read recent messages
+        max_wait_minutes: Maximum time to wait before resuming anyway (default 24 hours)
+
+    Returns True if the captcha was resolved, False on timeout.
+    """
+    pause = CaptchaPause(max_wait_minutes)
+    while True:
+        metrics.sleep("captcha_pause", pause.next_wait())
+        error = None
+        try:
+            with metrics.operation("captcha_check"):
+                channel.refresh()
+        except requests.RequestException as e:
+            # Keep the pause (and its backoff and deadline) through a flaky connection
+            error = e
+        resolved = pause.check(channel, error)
+        if resolved is not None:
+            return resolved
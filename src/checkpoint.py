@@ -0,0 +1,84 @@
+"""
+Checkpoint module - persists loop state between runs so restarts resume warm
+"""
+import json
+import os
+import time
+
+import clock
+import log
+
+
+# State file restored at startup and rewritten every iteration (empty to disable)
+STATE_FILE = "bot_state.json"
+
+# Ignore checkpoints older than this (in seconds)
+MAX_STATE_AGE = 60 * 60 * 24
+
+STATE_VERSION = 2
+
+
+class Checkpoint:
+    """Saves and restores the loop's state to a small JSON file.
+
+    Covers the break schedule counters, the channel cursor plus the newest
+    buffered messages, the tracked inventory, predicted gem lifetimes and when the
+    pending wait ends. Clock times are stored as ages and the file carries
+    its wall-clock save time, so they stay correct across processes.
+    """
+
+    def __init__(self, schedule, channel, inventory, active_gems, path=STATE_FILE):
+        self.schedule = schedule
+        self.channel = channel
+        self.inventory = inventory
+        self.active_gems = active_gems
+        self.path = path
+
+    def save(self, resume_at=None):
+        """Write the current state; resume_at is when the pending wait ends (clock time)"""
+        if not self.path:
+            return
+        state = {
+            "version": STATE_VERSION,
+            "saved_at": time.time(),
+            "resume_in": None if resume_at is None else max(0.0, resume_at - clock.now()),
+            "schedule": self.schedule.to_state(),
+            "channel": self.channel.to_state(),
+            "inventory": self.inventory.to_state(),
+            "active_gems": self.active_gems.to_state(),
+        }
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠️  Error writing state checkpoint: %s", e)
+
+    def restore(self):
+        """Load the state file if present and fresh; returns the clock time the
+        interrupted wait would have ended (None if nothing is pending)"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("⚠️  Error reading state checkpoint: %s", e)
+            return None
+
+        elapsed = max(0.0, time.time() - state.get("saved_at", 0))
+        if state.get("version") != STATE_VERSION or elapsed > MAX_STATE_AGE:
+            log.info("Ignoring stale state checkpoint")
+            return None
+
+        self.schedule.restore(state.get("schedule", {}))
+        self.channel.restore(state.get("channel", {}))
+        self.inventory.restore(state.get("inventory", {}), elapsed)
+        self.active_gems.restore(state.get("active_gems", {}), elapsed)
+        log.info("✓ Restored state checkpoint from %dm %ds ago", elapsed // 60, elapsed % 60)
+
+        resume_in = state.get("resume_in")
+        if resume_in is None or resume_in <= elapsed:
+            return None
+        return clock.now() + resume_in - elapsed
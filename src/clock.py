@@ -0,0 +1,78 @@
+"""
+Clock module - the time source behind every wait and timestamp, swappable for simulation
+"""
+import time
+
+
+class SystemClock:
+    """Real monotonic time and real sleeps"""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def async_sleep(self, seconds, wake=None):
+        """Sleep without blocking the event loop; ends early once wake (an asyncio.Event) is set"""
+        import asyncio  # only the asyncio engine sleeps this way; keep it off the startup path
+        if wake is None:
+            await asyncio.sleep(max(0, seconds))
+            return
+        try:
+            await asyncio.wait_for(wake.wait(), timeout=max(0, seconds))
+        except asyncio.TimeoutError:
+            pass
+
+
+class VirtualClock:
+    """Simulated time: sleeping advances the clock instantly.
+
+    ``advance`` moves time forward without it counting as a sleep, e.g. to
+    model request latency in a simulated transport.
+    """
+
+    def __init__(self, start=0.0):
+        self.t = float(start)
+
+    def now(self):
+        return self.t
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.t += seconds
+
+    async def async_sleep(self, seconds, wake=None):
+        """Advance instantly, yielding to the event loop once"""
+        import asyncio
+        self.sleep(seconds)
+        await asyncio.sleep(0)
+
+    def advance(self, seconds):
+        self.t += max(0.0, seconds)
+
+
+CLOCK = SystemClock()
+
+
+def set_clock(clock):
+    """Install clock as the time source for the whole bot; returns the previous one"""
+    global CLOCK
+    previous, CLOCK = CLOCK, clock
+    return previous
+
+
+def now():
+    """Current time in seconds from the installed clock (monotonic, arbitrary origin)"""
+    return CLOCK.now()
+
+
+def sleep(seconds):
+    """Sleep on the installed clock"""
+    CLOCK.sleep(seconds)
+
+
+async def async_sleep(seconds, wake=None):
+    """Sleep on the installed clock from a coroutine (see SystemClock.async_sleep)"""
+    await CLOCK.async_sleep(seconds, wake)
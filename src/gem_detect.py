@@ -1,124 +1,304 @@
 """
 Gem detection and usage module - handles inventory, gem detection, and gem usage
 """
-import os
 import re
-import sys
-import time
-import requests
-from initialization import GEM_TYPES, BASE_URL, get_headers
 
+import clock
+import log
+import metrics
+from initialization import GEM_TYPES, INVENTORY_TTL
+from message_cache import posted_message_id
 
-_USE_STAR_GEMS_CACHE = None
+
+# USE_STAR_GEMS from the startup Config
+_USE_STAR_GEMS = True
+
+# Gem ID -> gem type, precomputed so classifying an ID is one dict lookup
+GEM_ID_TO_TYPE = {
+    gem_id: gem_type
+    for gem_type, gem_range in GEM_TYPES.items()
+    for gem_id in gem_range
+}
+
+# One inventory entry: an item ID, its emoji, then an optional count.
+# Counts always follow the emoji, so they are never mistaken for IDs; a plain-digit
+# count must end the entry, else it is the next entry's ID (as in "051 ❤️ 052 💙 3").
+# e.g. "`051`<:cgem1:492572122514063371>⁰⁵"  or  "051 ❤️ 27"
+_ITEM_EMOJI = r"(?:<a?:\w+:\d+>|[^\w\s`<]+)"
+_INVENTORY_ITEM_RE = re.compile(
+    r"(?<![\w:])`?(\d{2,3})`?\s*" + _ITEM_EMOJI +
+    r"\s*([⁰¹²³⁴⁵⁶⁷⁸⁹]+|\d+(?=\s|$)(?!\s*`?" + _ITEM_EMOJI + r"))?"
+)
+_SUPERSCRIPT_DIGITS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+
+# An active gem's hunt counter, e.g. "<:egem3:510366792000000000> `[324/450]`" (hunts left/total)
+_GEM_COUNTER_RE = re.compile(r"[a-z]gem(\d+):\d+>\s*`?\[(\d+)/\d+\]")
+
+# Re-check active gems once a gem is predicted to have at most this many hunts left
+GEM_EXPIRY_MARGIN = 0
+
+# Re-check every N hunts while some active gem has no readable counter,
+# or after gems couldn't be used (inventory or ouse failed)
+GEM_CHECK_EVERY = 10
+
+# Re-check at least every N hunts, so gems bought or used elsewhere are noticed
+GEM_CHECK_MAX_HUNTS = 75
 
 
 def use_star_gems():
     """Return True if star gems (type5) should be used."""
-    global _USE_STAR_GEMS_CACHE
-    if _USE_STAR_GEMS_CACHE is not None:
-        return _USE_STAR_GEMS_CACHE
-
-    env_value = os.getenv("USE_STAR_GEMS")
-    if env_value is not None:
-        value = env_value.strip().lower()
-        _USE_STAR_GEMS_CACHE = value in ("1", "true", "yes", "y", "on")
-        return _USE_STAR_GEMS_CACHE
-
-    if os.getenv("GITHUB_ACTIONS", "").lower() == "true":
-        _USE_STAR_GEMS_CACHE = True
-        return _USE_STAR_GEMS_CACHE
-
-    if sys.stdin.isatty():
-        while True:
-            choice = input("Use star gems (type5)? [y/n]: ").strip().lower()
-            if choice in ("y", "yes"):
-                _USE_STAR_GEMS_CACHE = True
-                return _USE_STAR_GEMS_CACHE
-            if choice in ("n", "no"):
-                _USE_STAR_GEMS_CACHE = False
-                return _USE_STAR_GEMS_CACHE
-
-    _USE_STAR_GEMS_CACHE = True
-    return _USE_STAR_GEMS_CACHE
-
-
-def get_inventory(token):
-    """Fetch inventory by sending oinv command and reading the response"""
-    message = "oinv"
-    data = {"content": message}
-    
-    requests.post(BASE_URL, json=data, headers=get_headers(token))
-    time.sleep(3)  # Wait longer for bot response
-    
-    # Get recent messages
-    response = requests.get(BASE_URL + "?limit=15", headers=get_headers(token))
-    if response.status_code == 200:
-        messages = response.json()
-        for msg in messages:
-            # Check message content first
-            content = msg.get('content', '')
-            if 'Inventory' in content or 'inventory' in content.lower():
-                return content
-            
-            # Check embeds
-            if 'embeds' in msg and msg['embeds']:
-                for embed in msg['embeds']:
-                    title = embed.get('title', '').lower()
-                    description = embed.get('description', '')
-                    
-                    # Check for inventory keywords
-                    if ('inventory' in title or 'kurt' in title) and description:
-                        return description
+    return _USE_STAR_GEMS
+
+
+def set_use_star_gems(value):
+    """Apply the USE_STAR_GEMS setting from the startup Config"""
+    global _USE_STAR_GEMS
+    _USE_STAR_GEMS = bool(value)
+
+
+def _inventory_text(msg):
+    """Return the inventory text of a ParsedMessage, or None if it isn't an inventory"""
+    # Cheap reject on the pre-lowered blob before looking at individual parts
+    if 'inventory' not in msg.lower and 'kurt' not in msg.lower:
+        return None
+
+    # Check message content first
+    if 'inventory' in msg.content.lower():
+        return msg.content
     
+    # Check embeds
+    for embed in msg.embeds:
+        title = embed.title.lower()
+        # Check for inventory keywords
+        if ('inventory' in title or 'kurt' in title) and embed.description:
+            return embed.description
     return None
 
 
+def get_inventory(channel):
+    """Fetch inventory by sending oinv command and waiting for the bot's reply"""
+    with metrics.operation("inventory"):
+        posted_id = posted_message_id(channel.send_message("oinv"))
+        if posted_id is None:
+            return None
+        
+        reply = channel.wait_for_reply(posted_id, predicate=lambda msg: _inventory_text(msg) is not None)
+    if reply is None:
+        return None
+    return _inventory_text(reply)
+
+
 def parse_gems_from_inventory(inventory_text):
-    """Parse gem IDs from inventory text"""
+    """Parse gems from inventory text into {gem_id: count}"""
     if not inventory_text:
-        return []
-    
-    # Find all 3-digit numbers that look like gem IDs (051-126)
-    # The format is like: 051 ❤️ 27  or  051 (with emoji and count)
-    gems = re.findall(r'\b(0?[0-9]{2,3})\b', inventory_text)
-    
-    # Filter to only include gem IDs in our ranges
-    valid_gems = []
-    for g in gems:
-        gem_id = int(g)
-        # Check if this gem ID is in any of our defined ranges
-        for gem_range in GEM_TYPES.values():
-            if gem_id in gem_range:
-                valid_gems.append(gem_id)
-                break
-    
-    # Remove duplicates and sort
-    valid_gems = sorted(list(set(valid_gems)))
-    return valid_gems
+        return {}
 
+    gems = {}
+    for item_id, count in _INVENTORY_ITEM_RE.findall(inventory_text):
+        gem_id = int(item_id)
+        # Only keep IDs in our gem ranges
+        if gem_id not in GEM_ID_TO_TYPE:
+            continue
+        count = int(count.translate(_SUPERSCRIPT_DIGITS)) if count else 1
+        if count > 0:
+            gems[gem_id] = gems.get(gem_id, 0) + count
 
-def check_active_gems(token):
-    """Check which gem types are currently active by reading recent hunt messages"""
-    response = requests.get(BASE_URL + "?limit=15", headers=get_headers(token))
-    if response.status_code == 200:
-        messages = response.json()
+    return dict(sorted(gems.items()))
+
+
+class InventoryCache:
+    """Local model of owned gems, so oinv is not re-sent on every gem check.
+
+    Seeded from one oinv parse and decremented as our own ouse commands are
+    sent (nothing else changes gem counts). Re-syncs after ``ttl`` seconds, or
+    when a wanted type has run out because we used its last gem.
+    """
+
+    def __init__(self, channel, ttl=INVENTORY_TTL):
+        self.channel = channel
+        self.ttl = ttl
+        self.synced_at = None
+        self.sync_failed = False  # the last oinv fetch failed or got no reply in time
+        self._gems = {}
+        self._used_up_types = set()
+
+    def is_expired(self):
+        """Return True if the model must be re-synced before use"""
+        return self.synced_at is None or clock.now() - self.synced_at >= self.ttl
+
+    def sync(self):
+        """Replace the model with a fresh oinv parse; returns False if the fetch failed"""
+        inventory = get_inventory(self.channel)
+        self.sync_failed = inventory is None
+        if inventory is None:
+            return False
+        with metrics.timed("inventory_parse"):
+            self._gems = parse_gems_from_inventory(inventory)
+        self._used_up_types.clear()
+        self.synced_at = clock.now()
+        return True
+
+    def gems(self, wanted_types=()):
+        """Return {gem_id: count}, re-syncing first if expired or a wanted type ran out"""
+        if self.is_expired():
+            self.sync()
+        elif self._used_up_types.intersection(wanted_types):
+            log.info("Tracked inventory ran out for a needed gem type, re-syncing...")
+            self.sync()
+        return dict(self._gems)
+
+    def consume(self, gem_ids):
+        """Record that one of each gem in gem_ids was used"""
+        for gem_id in gem_ids:
+            count = self._gems.get(gem_id, 0) - 1
+            if count > 0:
+                self._gems[gem_id] = count
+                continue
+            self._gems.pop(gem_id, None)
+            gem_type = GEM_ID_TO_TYPE.get(gem_id)
+            if gem_type not in group_gems_by_type(self._gems):
+                self._used_up_types.add(gem_type)
+
+    def to_state(self):
+        """Checkpoint data; times are stored as ages so they survive a restart"""
+        return {
+            "gems": {str(gem_id): count for gem_id, count in self._gems.items()},
+            "synced_age": None if self.synced_at is None else clock.now() - self.synced_at,
+            "used_up_types": sorted(self._used_up_types),
+        }
+
+    def restore(self, state, elapsed=0.0):
+        """Load checkpoint data saved elapsed seconds ago"""
+        self._gems = {int(gem_id): count for gem_id, count in state.get("gems", {}).items()}
+        self._used_up_types = set(state.get("used_up_types", ()))
+        synced_age = state.get("synced_age")
+        self.synced_at = None if synced_age is None else clock.now() - synced_age - elapsed
+
+
+class ActiveGems:
+    """Predicts active gem lifetimes so active-gem checks only run when needed.
+
+    Each real check loads the hunts left per active type from the empowerment
+    text; every hunt sent counts one down. A check is due when a gem is about
+    to run out, right after gems were used or a prediction turned out wrong,
+    every GEM_CHECK_EVERY hunts while a gem has no counter or after gems
+    couldn't be used, and at least every GEM_CHECK_MAX_HUNTS hunts.
+    """
+
+    def __init__(self):
+        self.seen_at = {}  # gem_type -> clock time
+        self.hunts_left = {}  # gem_type -> predicted hunts left (None if unknown)
+        self.hunts_since_check = 0
+        self.confirm = True  # nothing known yet
+        self.retry = False  # gems for inactive types couldn't be used at the last check
+
+    def check_due(self):
+        """Return True if this iteration should read the active gems"""
+        if self.confirm or self.hunts_since_check >= GEM_CHECK_MAX_HUNTS:
+            return True
+        if self.retry and self.hunts_since_check >= GEM_CHECK_EVERY:
+            return True
+        for left in self.hunts_left.values():
+            if left is None:
+                if self.hunts_since_check >= GEM_CHECK_EVERY:
+                    return True
+            elif left <= GEM_EXPIRY_MARGIN:
+                return True
+        return False
+
+    def update(self, lifetimes):
+        """Load a real check's {gem_type: hunts_left}; returns the types still active"""
+        mismatched = [
+            gem_type for gem_type, left in self.hunts_left.items()
+            if left is not None and lifetimes.get(gem_type, 0) != left
+        ]
+        # Confirm a wrong prediction once; don't keep re-checking if it stays off
+        if mismatched and not self.confirm:
+            log.info("Gem lifetimes differ from prediction for %s, re-checking next iteration", mismatched)
+
+        now = clock.now()
+        active_gem_types = [gem_type for gem_type, left in lifetimes.items() if left != 0]
+        for gem_type in active_gem_types:
+            self.seen_at[gem_type] = now
+        self.hunts_left = {gem_type: lifetimes[gem_type] for gem_type in active_gem_types}
+        self.hunts_since_check = 0
+        self.confirm = bool(mismatched) and not self.confirm
+        self.retry = False
+        return active_gem_types
+
+    def record_hunt(self):
+        """One hunt was sent: every active gem with a counter loses a hunt"""
+        self.hunts_since_check += 1
+        for gem_type, left in self.hunts_left.items():
+            if left is not None:
+                self.hunts_left[gem_type] = max(0, left - 1)
+
+    def record_used(self):
+        """Gems were activated: read their counters on the next iteration"""
+        self.confirm = True
+
+    def record_unavailable(self):
+        """Gems for inactive types couldn't be used: check again after GEM_CHECK_EVERY hunts"""
+        self.retry = True
+
+    def record_failed_check(self):
+        """The active-gem read failed: keep the predictions and check again next iteration"""
+        self.confirm = True
+
+    def to_state(self):
+        now = clock.now()
+        return {
+            "seen_age": {gem_type: now - seen_at for gem_type, seen_at in self.seen_at.items()},
+            "hunts_left": self.hunts_left,
+            "hunts_since_check": self.hunts_since_check,
+            "confirm": self.confirm,
+            "retry": self.retry,
+        }
+
+    def restore(self, state, elapsed=0.0):
+        now = clock.now()
+        self.seen_at = {gem_type: now - age - elapsed for gem_type, age in state.get("seen_age", {}).items()}
+        self.hunts_left = dict(state.get("hunts_left", {}))
+        self.hunts_since_check = state.get("hunts_since_check", 0)
+        self.confirm = state.get("confirm", True)
+        self.retry = state.get("retry", False)
+
+
+def _empowerment_text(msg):
+    """Return the "hunt is empowered by" text of a ParsedMessage, or None"""
+    if 'hunt is empowered by' not in msg.lower:
+        return None
+
+    # Check message content
+    if 'hunt is empowered by' in msg.content.lower():
+        return msg.content
+
+    # Check all embeds
+    for embed in msg.embeds:
+        if 'hunt is empowered by' in embed.description.lower() or 'hunt is empowered by' in embed.title.lower():
+            return embed.description + ' ' + embed.title
+    return None
+
+
+def check_gem_lifetimes(channel):
+    """Read hunts left per active gem type from recent hunt messages; None if the read failed"""
+    with metrics.operation("gem_check"):
+        messages = channel.messages(limit=15)
+    if channel.status_code != 200:
+        log.warning("Gem check failed: status=%s body=%s", channel.status_code, channel.error_text)
+        return None
+    with metrics.timed("gem_parse"):
         for msg in messages:
-            # Check message content
-            content = msg.get('content', '').lower()
-            if 'hunt is empowered by' in content:
-                return parse_active_gems_from_text(msg.get('content', ''))
-            
-            # Check all embeds
-            if 'embeds' in msg and msg['embeds']:
-                for embed in msg['embeds']:
-                    description = embed.get('description', '').lower()
-                    title = embed.get('title', '').lower()
-                    
-                    if 'hunt is empowered by' in description or 'hunt is empowered by' in title:
-                        full_text = embed.get('description', '') + ' ' + embed.get('title', '')
-                        return parse_active_gems_from_text(full_text)
-    
-    return []
+            text = _empowerment_text(msg)
+            if text is not None:
+                return parse_gem_lifetimes_from_text(text)
+
+    return {}
+
+
+def check_active_gems(channel):
+    """Check which gem types are currently active by reading recent hunt messages"""
+    return list(check_gem_lifetimes(channel) or ())
 
 
 def parse_active_gems_from_text(text):
@@ -145,6 +325,16 @@ def parse_active_gems_from_text(text):
     return active_gem_types
 
 
+def parse_gem_lifetimes_from_text(text):
+    """Parse {gem_type: hunts_left} from hunt empowerment text (None when a gem shows no counter)"""
+    lifetimes = dict.fromkeys(parse_active_gems_from_text(text))
+    for gem_num, left in _GEM_COUNTER_RE.findall(text):
+        gem_type = f"type{int(gem_num)}"
+        if gem_type in lifetimes and lifetimes[gem_type] is None:
+            lifetimes[gem_type] = int(left)
+    return lifetimes
+
+
 def get_inactive_gem_types(active_gem_types):
     """Determine which gem types are NOT active"""
     inactive_types = []
@@ -157,22 +347,30 @@ def get_inactive_gem_types(active_gem_types):
     return inactive_types
 
 
+def group_gems_by_type(available_gems):
+    """Group owned gem IDs by type in one pass: {gem_type: [gem_id, ...]} (sorted)"""
+    grouped = {}
+    for gem_id in sorted(available_gems):
+        gem_type = GEM_ID_TO_TYPE.get(gem_id)
+        if gem_type is not None:
+            grouped.setdefault(gem_type, []).append(gem_id)
+    return grouped
+
+
 def select_gems_to_use(available_gems, inactive_types):
     """Select highest gems from inactive types only"""
-    selected_gems = []
-    
-    for gem_type in inactive_types:
-        if gem_type == "type5" and not use_star_gems():
-            continue
-        gem_range = GEM_TYPES[gem_type]
-        # Find gems of this type that you actually own
-        type_gems = [g for g in available_gems if g in gem_range]
-        if type_gems:
-            # Get the highest one
-            highest = max(type_gems)
-            selected_gems.append(highest)
-    
-    return sorted(selected_gems)
+    wanted = set(inactive_types)
+    if not use_star_gems():
+        wanted.discard("type5")
+
+    # Single pass over owned gems, keeping the highest ID per wanted type
+    highest = {}
+    for gem_id in available_gems:
+        gem_type = GEM_ID_TO_TYPE.get(gem_id)
+        if gem_type in wanted and gem_id > highest.get(gem_type, 0):
+            highest[gem_type] = gem_id
+
+    return sorted(highest.values())
 
 
 def format_gem_command(gems):
@@ -183,14 +381,6 @@ def format_gem_command(gems):
 
 def get_highest_gems_by_type(available_gems):
     """Get the highest gem ID for each type"""
-    selected_gems = []
-    
-    for gem_type, gem_range in GEM_TYPES.items():
-        # Find gems of this type
-        type_gems = [g for g in available_gems if g in gem_range]
-        if type_gems:
-            # Get the highest one
-            highest = max(type_gems)
-            selected_gems.append(highest)
-    
+    grouped = group_gems_by_type(available_gems)
+    selected_gems = [type_gems[-1] for type_gems in grouped.values()]
     return sorted(selected_gems)[:3]  # Return top 3 gems
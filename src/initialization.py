@@ -1,47 +1,29 @@
 """
-Initialization module - handles token loading and configuration setup
+Initialization module - bot constants, config loading and the shared Discord client
 """
 import json
 import os
-import sys
-
-# Platform-specific imports
-try:
-    import winsound
-    HAS_WINSOUND = True
-except ImportError:
-    HAS_WINSOUND = False
-
-try:
-    from plyer import notification
-    HAS_PLYER = True
-except ImportError:
-    HAS_PLYER = False
-
-def _load_local_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠️  Error reading config.json: {e}")
-    return {}
-
-
-_LOCAL_CONFIG = _load_local_config()
-
-# Discord channel configuration (env for Actions, config.json for local)
-CHANNEL_ID = os.getenv("CHANNEL_ID") or _LOCAL_CONFIG.get("channel_id")
-CHANNEL_URL = os.getenv("CHANNEL_URL") or _LOCAL_CONFIG.get("channel_url")
-
-if not CHANNEL_ID or not CHANNEL_URL:
-    print("ERROR: Channel config not found!")
-    print("  Option 1 (GitHub Actions): Set CHANNEL_ID and CHANNEL_URL as secrets/inputs")
-    print("  Option 2 (Local): Create src/config.json with channel_id and channel_url")
-    sys.exit(1)
-
-BASE_URL = f"https://discordapp.com/api/v9/channels/{CHANNEL_ID}/messages"
+import random
+
+import requests
+
+import checkpoint
+import clock
+import log
+import metrics
+import notify
+import recorder
+import retry_policy
+from metrics import METRICS
+from rate_limit import RateLimiter
+from retry_policy import CircuitBreaker, CircuitOpenError, policy_for
+
+
+# Local config file, read once by load_config (env vars take precedence)
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
+
+# API root; point DISCORD_API_URL at a local stand-in server to run offline
+DEFAULT_API_URL = "https://discordapp.com/api/v9"
 
 # Gem type ranges - define which gem IDs belong to which type
 GEM_TYPES = {
@@ -68,29 +50,296 @@ SHORT_BREAK_MAX = 60 * 5
 LONG_BREAK_MIN = 60 * 45
 LONG_BREAK_MAX = 60 * 80
 
+# Captcha pause: first checks every CAPTCHA_POLL_MIN seconds, then doubling up to CAPTCHA_POLL_MAX
+CAPTCHA_POLL_MIN = 5
+CAPTCHA_POLL_MAX = 60 * 5
+CAPTCHA_FAST_POLLS = 6
+# Resume anyway if the captcha is still there after this long (in minutes)
+CAPTCHA_MAX_WAIT_MINUTES = 60 * 24
+
+# Max age of the locally tracked inventory before re-syncing with oinv (in seconds)
+INVENTORY_TTL = 60 * 60
+
+
+class ConfigError(Exception):
+    """Missing or invalid configuration; the message says how to fix it"""
+
+
+class Config:
+    """Validated startup settings: env vars (GitHub Actions) first, then config.json (local).
+
+    Beyond the channel and token, each setting is named after its env var
+    (config.json uses the lowercase key) and defaults to the owning module's
+    constant.
+    """
+
+    def __init__(self, token, channel_id, channel_url, api_url=DEFAULT_API_URL, use_star_gems=True,
+                 log_level=log.LOG_LEVEL, log_buffer_size=log.LOG_BUFFER_SIZE,
+                 log_repeat_window=log.LOG_REPEAT_WINDOW,
+                 metrics_file=metrics.METRICS_FILE, metrics_prom_file=metrics.METRICS_PROM_FILE,
+                 metrics_interval=metrics.METRICS_INTERVAL,
+                 notify_backends=notify.NOTIFY_BACKENDS, notify_webhook_url=notify.NOTIFY_WEBHOOK_URL,
+                 notify_file=notify.NOTIFY_FILE, notify_debounce=notify.NOTIFY_DEBOUNCE,
+                 connect_timeout=retry_policy.CONNECT_TIMEOUT, read_timeout=retry_policy.READ_TIMEOUT,
+                 state_file=checkpoint.STATE_FILE, record_messages=recorder.RECORD_MESSAGES):
+        self.token = token
+        self.channel_id = channel_id
+        self.channel_url = channel_url
+        self.api_url = api_url
+        self.use_star_gems = use_star_gems
+        self.log_level = log_level
+        self.log_buffer_size = log_buffer_size
+        self.log_repeat_window = log_repeat_window
+        self.metrics_file = metrics_file
+        self.metrics_prom_file = metrics_prom_file
+        self.metrics_interval = metrics_interval
+        self.notify_backends = notify_backends
+        self.notify_webhook_url = notify_webhook_url
+        self.notify_file = notify_file
+        self.notify_debounce = notify_debounce
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.state_file = state_file
+        self.record_messages = record_messages
+
+    @property
+    def messages_url(self):
+        return f"{self.api_url}/channels/{self.channel_id}/messages"
+
+
+_TRUE_WORDS = ("1", "true", "yes", "y", "on")
+_FALSE_WORDS = ("0", "false", "no", "n", "off")
+
+
+def parse_bool(value, default, name="setting"):
+    """Read a yes/no setting from an env string or a JSON value; raises ConfigError if unrecognised"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    word = str(value).strip().lower()
+    if word in _TRUE_WORDS:
+        return True
+    if word in _FALSE_WORDS:
+        return False
+    raise ConfigError(f"{name} must be true or false, got {value!r}")
+
+
+def _setting(env, local, name, keep_empty=True):
+    """Raw value of a setting: env var, else the lowercase config.json key, else None.
+
+    An empty env var counts as set (e.g. STATE_FILE= disables the checkpoint)
+    unless keep_empty is False, where it defers to config.json.
+    """
+    value = env.get(name)
+    if value is not None and (value != "" or keep_empty):
+        return value
+    return local.get(name.lower())
+
+
+def _text(env, local, name, default):
+    value = _setting(env, local, name)
+    return default if value is None else str(value).strip()
 
-def load_token():
-    """Load Discord token from config.json (local) or environment variable"""
-    token = os.getenv("DISCORD_TOKEN")
-    if token:
-        print("✓ Loaded token from DISCORD_TOKEN environment variable")
-        return token.strip()
 
-    token = _LOCAL_CONFIG.get("token") if isinstance(_LOCAL_CONFIG, dict) else None
+def _number(env, local, name, default, convert=float, allow_zero=True):
+    value = _setting(env, local, name)
+    if value is None or value == "":
+        return default
+    try:
+        number = convert(value)
+    except (TypeError, ValueError):
+        kind = "a whole number" if convert is int else "a number"
+        raise ConfigError(f"{name} must be {kind}, got {value!r}") from None
+    if number < 0 or (number == 0 and not allow_zero):
+        raise ConfigError(f"{name} must be {'at least 0' if allow_zero else 'greater than 0'}, got {value!r}")
+    return number
+
+
+def _read_config_file(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning("⚠️  Error reading config.json: %s", e)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_config(environ=None, path=CONFIG_PATH):
+    """Parse and validate the settings once at startup; raises ConfigError"""
+    env = os.environ if environ is None else environ
+    local = _read_config_file(path)
+
+    channel_id = str(env.get("CHANNEL_ID") or local.get("channel_id") or "").strip()
+    channel_url = str(env.get("CHANNEL_URL") or local.get("channel_url") or "").strip()
+    if not channel_id or not channel_url:
+        raise ConfigError(
+            "Channel config not found!\n"
+            "  Option 1 (GitHub Actions): Set CHANNEL_ID and CHANNEL_URL as secrets/inputs\n"
+            "  Option 2 (Local): Create src/config.json with channel_id and channel_url"
+        )
+    if not channel_id.isdigit():
+        raise ConfigError(f"CHANNEL_ID must be a numeric Discord channel ID, got {channel_id!r}")
+
+    token = env.get("DISCORD_TOKEN")
     if token:
-        print("✓ Loaded token from config.json")
-        return str(token).strip()
+        log.info("✓ Loaded token from DISCORD_TOKEN environment variable")
+    else:
+        token = local.get("token")
+        if token:
+            log.info("✓ Loaded token from config.json")
+    if not token or not str(token).strip():
+        raise ConfigError(
+            "Token not found!\n"
+            "  Option 1 (GitHub Actions): Set DISCORD_TOKEN secret\n"
+            "  Option 2 (Local): Add token to src/config.json"
+        )
 
-    print("ERROR: Token not found!")
-    print("  Option 1 (GitHub Actions): Set DISCORD_TOKEN secret")
-    print("  Option 2 (Local): Add token to src/config.json")
-    sys.exit(1)
+    log_level = _text(env, local, "LOG_LEVEL", log.LOG_LEVEL).upper() or log.LOG_LEVEL
+    if log_level not in log.LOG_LEVELS:
+        raise ConfigError(f"LOG_LEVEL must be one of {', '.join(log.LOG_LEVELS)}, got {log_level!r}")
 
+    backends = _setting(env, local, "NOTIFY_BACKENDS")
+    if backends is None:
+        backends = notify.NOTIFY_BACKENDS
+    else:
+        if isinstance(backends, str):
+            backends = backends.split(",")
+        backends = tuple(name for name in (str(part).strip() for part in backends) if name)
+        unknown = [name for name in backends if name not in notify.BACKENDS]
+        if unknown:
+            raise ConfigError(f"Unknown NOTIFY_BACKENDS {', '.join(unknown)} "
+                              f"(choose from {', '.join(notify.BACKENDS)})")
 
-def get_headers(token):
+    return Config(
+        token=str(token).strip(),
+        channel_id=channel_id,
+        channel_url=channel_url,
+        api_url=str(_setting(env, local, "DISCORD_API_URL", keep_empty=False) or DEFAULT_API_URL).rstrip("/"),
+        use_star_gems=parse_bool(_setting(env, local, "USE_STAR_GEMS", keep_empty=False), default=True,
+                                 name="USE_STAR_GEMS"),
+        log_level=log_level,
+        log_buffer_size=_number(env, local, "LOG_BUFFER_SIZE", log.LOG_BUFFER_SIZE, int),
+        log_repeat_window=_number(env, local, "LOG_REPEAT_WINDOW", log.LOG_REPEAT_WINDOW),
+        metrics_file=_text(env, local, "METRICS_FILE", metrics.METRICS_FILE),
+        metrics_prom_file=_text(env, local, "METRICS_PROM_FILE", metrics.METRICS_PROM_FILE),
+        metrics_interval=_number(env, local, "METRICS_INTERVAL", metrics.METRICS_INTERVAL),
+        notify_backends=backends,
+        notify_webhook_url=_text(env, local, "NOTIFY_WEBHOOK_URL", notify.NOTIFY_WEBHOOK_URL),
+        notify_file=_text(env, local, "NOTIFY_FILE", notify.NOTIFY_FILE),
+        notify_debounce=_number(env, local, "NOTIFY_DEBOUNCE", notify.NOTIFY_DEBOUNCE),
+        connect_timeout=_number(env, local, "REQUEST_CONNECT_TIMEOUT", retry_policy.CONNECT_TIMEOUT,
+                                allow_zero=False),
+        read_timeout=_number(env, local, "REQUEST_READ_TIMEOUT", retry_policy.READ_TIMEOUT, allow_zero=False),
+        state_file=_text(env, local, "STATE_FILE", checkpoint.STATE_FILE),
+        record_messages=_text(env, local, "RECORD_MESSAGES", recorder.RECORD_MESSAGES),
+    )
+
+
+def get_headers(token, referrer=None):
     """Create header dictionary for Discord API requests"""
-    return {
+    headers = {
         "User-Agent": USER_AGENT,
         "authorization": token,
-        "referrer": CHANNEL_URL
     }
+    if referrer:
+        headers["referrer"] = referrer
+    return headers
+
+
+class DiscordClient:
+    """Shared keep-alive client for all Discord API calls.
+
+    Headers are built once and the underlying requests.Session reuses the
+    TLS connection between calls instead of handshaking on every request.
+    Every request goes through a RateLimiter so Discord's buckets are honored,
+    and each attempt is recorded in METRICS under the current operation.
+    The operation's RequestPolicy sets connect/read timeouts and retries 5xx
+    and connection errors with jittered backoff; once retries run out the
+    failure counts towards the CircuitBreaker, and while that is open
+    requests raise CircuitOpenError without being sent.
+    """
+
+    def __init__(self, token, base_url, referrer=None, rate_limiter=None, session=None, breaker=None, rng=None,
+                 policies=None):
+        self.base_url = base_url
+        self.policies = policies or retry_policy.POLICIES
+        self.session = session or requests.Session()
+        self.session.headers.update(get_headers(token, referrer))
+        self.rate_limiter = rate_limiter or RateLimiter(
+            sleep=lambda seconds: metrics.sleep("rate_limit_wait", seconds)
+        )
+        self.breaker = breaker or CircuitBreaker()
+        self.rng = rng or random.Random()
+
+    def _request(self, route, method, **kwargs):
+        endpoint = METRICS.endpoint or route
+        policy = policy_for(METRICS.endpoint, self.policies)
+        if self.breaker.is_open():
+            raise CircuitOpenError(f"circuit open for {self.breaker.remaining():.0f}s, not sending {route}")
+
+        def attempt():
+            start = clock.now()
+            try:
+                response = self.session.request(method, self.base_url, timeout=policy.timeout, **kwargs)
+            except requests.exceptions.Timeout:
+                METRICS.record_request(endpoint, "timeout", clock.now() - start)
+                METRICS.record_failure(endpoint, "timeouts")
+                raise
+            except requests.RequestException:
+                METRICS.record_request(endpoint, "error", clock.now() - start)
+                raise
+            METRICS.record_request(endpoint, response.status_code, clock.now() - start)
+            return response
+
+        retry = 0
+        while True:
+            response, error = None, None
+            try:
+                response = self.rate_limiter.send(route, attempt)
+            except requests.RequestException as e:
+                error = e
+            if error is None and response.status_code < 500:
+                self.breaker.record_success()
+                return response
+
+            if retry >= policy.max_retries or not policy.should_retry(method, response, error):
+                METRICS.record_failure(endpoint, "failures")
+                if self.breaker.record_failure():
+                    log.warning("⚠️  %d requests failed in a row, pausing requests for %ds",
+                                self.breaker.failures, self.breaker.remaining())
+                if error is not None:
+                    raise error
+                return response
+
+            delay = policy.backoff(retry, self.rng)
+            retry += 1
+            METRICS.record_failure(endpoint, "retries")
+            log.info("%s failed (%s), retry %d in %.2fs", route,
+                     error if error is not None else response.status_code, retry, delay)
+            metrics.sleep("retry_backoff", delay)
+
+    def get_messages(self, limit=None, after=None):
+        """GET recent channel messages (newest first)"""
+        params = {}
+        if limit is not None:
+            params["limit"] = limit
+        if after is not None:
+            params["after"] = after
+        return self._request("GET messages", "GET", params=params)
+
+    def send_message(self, content):
+        """POST a message to the channel"""
+        return self._request("POST messages", "POST", json={"content": content})
+
+    def close(self):
+        self.session.close()
+
+
+def create_client(config):
+    """Create the shared Discord client for a Config (call once at startup)"""
+    policies = retry_policy.create_policies(config.connect_timeout, config.read_timeout)
+    return DiscordClient(config.token, config.messages_url, referrer=config.channel_url, policies=policies)
@@ -0,0 +1,111 @@
+"""
+Log module - leveled console logging with repeat suppression and an in-memory
+ring buffer that is dumped on errors and captchas
+"""
+import logging
+import sys
+from collections import deque
+
+import clock
+
+
+# Lowest level written to the console (LOG_LEVEL in the startup Config)
+LOG_LEVEL = "INFO"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+# Records of every level kept in memory, dumped on error or captcha
+LOG_BUFFER_SIZE = 200
+
+# An identical console line is written at most once per this many seconds
+LOG_REPEAT_WINDOW = 300
+
+_REPEAT_KEYS_MAX = 256
+
+logger = logging.getLogger("owo")
+logger.setLevel(logging.DEBUG)
+logger.propagate = False
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the newest records unformatted; they are only formatted when dumped.
+
+    Any ERROR record dumps the buffer, so the lead-up to a failure is printed
+    even when the console level hides it.
+    """
+
+    def __init__(self, capacity=LOG_BUFFER_SIZE, stream=None):
+        super().__init__(logging.DEBUG)
+        self.records = deque(maxlen=capacity)
+        self.stream = stream
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s", "%H:%M:%S"))
+
+    def emit(self, record):
+        self.records.append(record)
+        if record.levelno >= logging.ERROR:
+            self.dump("error")
+
+    def dump(self, reason):
+        """Write and clear the buffered records"""
+        if not self.records:
+            return
+        stream = self.stream or sys.stdout
+        stream.write(f"----- last {len(self.records)} log records ({reason}) -----\n")
+        for record in self.records:
+            stream.write(self.format(record) + "\n")
+        stream.write("----- end of log records -----\n")
+        stream.flush()
+        self.records.clear()
+
+
+class RepeatFilter(logging.Filter):
+    """Drops a line already written in the last ``window`` seconds; the next
+    time it gets through it carries the number of copies dropped"""
+
+    def __init__(self, window=LOG_REPEAT_WINDOW):
+        super().__init__()
+        self.window = window
+        self._seen = {}  # message -> [clock time written, copies dropped since]
+
+    def filter(self, record):
+        message = record.getMessage()
+        now = clock.now()
+        entry = self._seen.get(message)
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{message} (repeated {entry[1]}x)"
+            record.args = None
+        if len(self._seen) >= _REPEAT_KEYS_MAX:
+            self._seen.clear()
+        self._seen[message] = [now, 0]
+        return True
+
+
+BUFFER = RingBufferHandler()
+
+
+def setup(level=LOG_LEVEL, stream=None, buffer_size=LOG_BUFFER_SIZE, repeat_window=LOG_REPEAT_WINDOW):
+    """Attach the console and ring buffer handlers (safe to call again)"""
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    if BUFFER.records.maxlen != buffer_size:
+        BUFFER.records = deque(BUFFER.records, maxlen=buffer_size)
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setLevel(level)
+    console.addFilter(RepeatFilter(repeat_window))
+    logger.addHandler(console)
+    logger.addHandler(BUFFER)
+
+
+def dump(reason):
+    """Print the buffered lead-up (e.g. on captcha)"""
+    BUFFER.dump(reason)
+
+
+debug = logger.debug
+info = logger.info
+warning = logger.warning
+error = logger.error
+exception = logger.exception
@@ -1,137 +1,235 @@
 """
 Main bot loop - orchestrates OwO bot farming with gem management and captcha handling
 """
+import sys
+
 import requests
-import time
-import random
-
-from initialization import (
-    load_token, get_headers, BASE_URL, GEM_TYPES,
-    ITERATION_WAIT_MIN, ITERATION_WAIT_MAX,
-    SHORT_BREAK_MIN, SHORT_BREAK_MAX,
-    LONG_BREAK_MIN, LONG_BREAK_MAX
-)
+
+import clock
+import log
+import metrics
+import notify
+from metrics import METRICS
+
+from initialization import ConfigError, load_config, create_client
+from checkpoint import Checkpoint
+from retry_policy import FAILED_ITERATION_WAIT
+from message_cache import ChannelSnapshot, posted_message_id
+from scheduler import BreakSchedule
+from recorder import create_recorder
 from captcha_detect import check_for_captcha, notify_captcha, wait_for_captcha_resolution
 from gem_detect import (
-    get_inventory,
-    parse_gems_from_inventory,
-    check_active_gems,
+    ActiveGems,
+    InventoryCache,
+    check_gem_lifetimes,
     get_inactive_gem_types,
+    group_gems_by_type,
     select_gems_to_use,
     format_gem_command,
-    use_star_gems
+    set_use_star_gems
 )
 
 
-def send_command(token, message):
+def send_command(channel, message):
     """Send a command message to Discord"""
-    data = {"content": message}
-    return requests.post(BASE_URL, json=data, headers=get_headers(token))
+    with metrics.operation("send"):
+        return channel.send_message(message)
 
 
-def main():
-    """Main bot loop"""
-    # Load token at startup
-    token = load_token()
-
-    # Prompt once for star gem usage (if running locally)
-    use_star_gems()
-    
-    # Initialize counters
-    message_count = 0
-    riel_count = 0
-    cnt = 0
-    
-    print("Bot started. Running indefinitely...\n")
-    
-    while True:
-        if check_for_captcha(token):
-            notify_captcha()  # Send notification alert
-            print("\n⚠️  CAPTCHA DETECTED! ⚠️")
-            print("Pausing requests until captcha is resolved...")
-            time.sleep(3)
-            continue
-        # Send basic farming commands
-        print("Sending farming commands...")
-        send_command(token, "oh")
-        send_command(token, "ob")
-        send_command(token, "owo")
-        
-        # Check for captcha after sending commands
-        time.sleep(1)  # Wait a moment for bot response
-       
-        if riel_count % 10 == 0:
-            # Check which gems are currently active
-            print("Checking active gems...")
-            active_gem_types = check_active_gems(token)
-            print(f"Active gem types: {active_gem_types}")
-        
-            # Determine which gem types are NOT active
-            inactive_types = get_inactive_gem_types(active_gem_types)
-            print(f"Inactive gem types: {inactive_types}")
+def use_gems(channel, inventory, active_gems):
+    """Activate the highest owned gem of every inactive type"""
+    # Only read the hunt messages when a gem is predicted to run out
+    if not active_gems.check_due():
+        return
+
+    # Check which gems are currently active
+    log.debug("Checking active gems...")
+    activate_gems(channel, inventory, active_gems, check_gem_lifetimes(channel))
+
+
+def activate_gems(channel, inventory, active_gems, lifetimes):
+    """Apply an active-gem check ({gem_type: hunts_left}) and use gems for the inactive types"""
+    # A failed read says nothing about which gems are active; don't use any
+    if lifetimes is None:
+        active_gems.record_failed_check()
+        return
+
+    active_gem_types = active_gems.update(lifetimes)
+    log.debug("Active gem types: %s (hunts left: %s)", active_gem_types, lifetimes)
+
+    # Determine which gem types are NOT active
+    inactive_types = get_inactive_gem_types(active_gem_types)
+    log.debug("Inactive gem types: %s", inactive_types)
+
+    # Only proceed if there are inactive types
+    if not inactive_types:
+        log.debug("All gem types are already active, no need to use gems!")
+    else:
+        # Read gems from the local inventory model (syncs via oinv when needed)
+        available_gems = inventory.gems(inactive_types)
+        log.debug("Available gems in inventory: %s", available_gems)
+        if inventory.sync_failed:
+            # Try again in a few hunts rather than at the next routine check
+            active_gems.record_unavailable()
         
-            # Only proceed if there are inactive types
-            if not inactive_types:
-                print("All gem types are already active, no need to use gems!")
-                riel_count = 0
-            else:
-                # Get inventory and parse available gems
-                print("Fetching inventory...")
-                inventory = get_inventory(token)
-                available_gems = parse_gems_from_inventory(inventory)
-                print(f"Available gems in inventory: {available_gems}")
+        if available_gems:
+            # Select highest gems from inactive types only
+            selected_gems = select_gems_to_use(available_gems, inactive_types)
+            
+            if selected_gems:
+                # Show which gems are the highest for each type
+                gems_by_type = group_gems_by_type(available_gems)
+                for gem_type in inactive_types:
+                    type_gems = gems_by_type.get(gem_type)
+                    if type_gems:
+                        log.debug("%s: available %s, using %s", gem_type, type_gems, type_gems[-1])
+                
+                message = format_gem_command(selected_gems)
+                log.info("Using gems: %s", message)
                 
-                if available_gems:
-                    # Select highest gems from inactive types only
-                    selected_gems = select_gems_to_use(available_gems, inactive_types)
-                    
-                    if selected_gems:
-                        # Show which gems are the highest for each type
-                        for gem_type in inactive_types:
-                            type_range = GEM_TYPES[gem_type]
-                            type_gems = [g for g in available_gems if g in type_range]
-                            if type_gems:
-                                print(f"{gem_type}: available {type_gems}, using {max(type_gems)}")
-                        
-                        message = format_gem_command(selected_gems)
-                        print(f"Using gems: {message}")
-                        
-                        send_command(token, message)
-                    else:
-                        print("No gems available for inactive types!")
+                # Only count the gems as used once Discord accepted the command
+                if posted_message_id(send_command(channel, message)) is not None:
+                    inventory.consume(selected_gems)
+                    active_gems.record_used()
                 else:
-                    print("Couldn't fetch inventory!")
-        
-        message_count += 2  # Increment message count
-        riel_count += 1
-        
-        # Check if we've sent 30 messages - then rest
-        print(f"Messages sent: {riel_count}")
-        if message_count >= 30:
-            wait_time = random.randint(SHORT_BREAK_MIN, SHORT_BREAK_MAX)
-            print(f"Short break: {wait_time} seconds ({wait_time // 60} min {wait_time % 60} sec)...")
-            time.sleep(wait_time)
-            message_count = 0  # Reset message counter
-        
-        # Check riel count - after 75 riel, increment cycle counter
-        if riel_count >= 75:
-            cnt += 1
-            riel_count = 0
-        
-        # After 2 full cycles, take a longer break
-        if cnt >= 2:
-            wait_time = random.randint(LONG_BREAK_MIN, LONG_BREAK_MAX)
-            hours = wait_time // 3600
-            minutes = (wait_time % 3600) // 60
-            print(f"Long break: {hours}h {minutes}m ({wait_time} seconds)...")
-            time.sleep(wait_time)
-            cnt = 0
-        
-        # Random wait between iterations
-        wait_time = random.randint(ITERATION_WAIT_MIN, ITERATION_WAIT_MAX)
-        print(f"Waiting {wait_time} seconds before next iteration...\n")
-        time.sleep(wait_time)
+                    log.warning("Couldn't send %s, gems not used", message)
+                    active_gems.record_unavailable()
+            else:
+                log.info("No gems available for inactive types!")
+        elif inventory.synced_at is None:
+            log.warning("Couldn't fetch inventory!")
+        else:
+            log.info("No gems left in inventory!")
+
+
+def run_iteration(channel, inventory, active_gems):
+    """One pass of the loop: captcha gate, gem upkeep, farming commands.
+
+    Returns False if a captcha paused the bot and was solved, so no farming
+    commands were sent; after a pause times out the commands are sent anyway.
+    """
+    # One read per iteration; captcha and gem checks share this snapshot
+    with metrics.operation("captcha_check"):
+        channel.refresh()
+    if check_for_captcha(channel):
+        notify_captcha()  # Send notification alert
+        log.warning("⚠️  CAPTCHA DETECTED! Pausing requests until captcha is resolved...")
+        log.dump("captcha")
+        if wait_for_captcha_resolution(channel):
+            # Solved: start over with a fresh captcha check
+            return False
+
+    # Gem checks run before posting so they reuse the snapshot above
+    use_gems(channel, inventory, active_gems)
+
+    # Send basic farming commands
+    log.debug("Sending farming commands...")
+    send_command(channel, "oh")
+    active_gems.record_hunt()
+    send_command(channel, "ob")
+    send_command(channel, "owo")
+    return True
+
+
+def announce_break(category, wait_time):
+    """Log a scheduled wait before taking it"""
+    if category == "short_break":
+        log.info("Short break: %d seconds (%d min %d sec)...", wait_time, wait_time // 60, wait_time % 60)
+    elif category == "long_break":
+        hours = wait_time // 3600
+        minutes = (wait_time % 3600) // 60
+        log.info("Long break: %dh %dm (%d seconds)...", hours, minutes, wait_time)
+    elif category == "resume_wait":
+        log.info("Resuming interrupted break: %d seconds left...", wait_time)
+    elif category == "circuit_open":
+        log.warning("Discord unreachable, pausing %d seconds before retrying...", wait_time)
+    else:
+        log.debug("Waiting %d seconds before next iteration...", wait_time)
+
+
+def take_break(category, wait_time):
+    """Announce and sleep one scheduled wait"""
+    announce_break(category, wait_time)
+    metrics.sleep(category, wait_time)
+
+
+def failure_wait(channel, error):
+    """Log an iteration aborted by a failed request; returns the (category, seconds) to wait"""
+    log.warning("⚠️  Iteration aborted: %s", error)
+    # Pause for the circuit breaker if it opened
+    pause = channel.client.breaker.remaining()
+    if pause > 0:
+        return "circuit_open", int(pause) + 1
+    return "error_wait", FAILED_ITERATION_WAIT
+
+
+def run(channel, inventory, schedule, active_gems, until=None, checkpoint=None):
+    """Run the bot loop until clock.now() reaches until (forever if None).
+
+    With a checkpoint, state is saved after every iteration before its waits.
+    """
+    log.info("Bot started. Running indefinitely..." if until is None else "Bot started.")
+    while until is None or clock.now() < until:
+        METRICS.maybe_flush()
+        try:
+            if not run_iteration(channel, inventory, active_gems):
+                continue
+        except requests.RequestException as e:
+            # Skip the rest of the iteration
+            take_break(*failure_wait(channel, e))
+            continue
+
+        waits = schedule.finish_iteration()
+        log.debug("Messages sent: %d", schedule.riel_count)
+        if checkpoint is not None:
+            checkpoint.save(resume_at=clock.now() + sum(wait_time for _, wait_time in waits))
+        for category, wait_time in waits:
+            take_break(category, wait_time)
+
+
+def prepare():
+    """Load config, build the loop's state and restore the last checkpoint.
+
+    Returns (channel, inventory, schedule, active_gems, checkpoint, resume_at).
+    """
+    log.setup()
+    # Read env/config.json once; nothing is loaded at import time
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    log.setup(config.log_level, buffer_size=config.log_buffer_size, repeat_window=config.log_repeat_window)
+    METRICS.configure(config.metrics_file, config.metrics_prom_file, config.metrics_interval)
+    notify.setup(config.notify_backends, config.notify_webhook_url, config.notify_file, config.notify_debounce)
+    set_use_star_gems(config.use_star_gems)
+
+    client = create_client(config)
+    channel = ChannelSnapshot(client, recorder=create_recorder(config.record_messages))
+    inventory = InventoryCache(channel)
+    schedule = BreakSchedule()
+    active_gems = ActiveGems()
+
+    # Resume counters, cursor, inventory and any unfinished break from the last run
+    checkpoint = Checkpoint(schedule, channel, inventory, active_gems, path=config.state_file)
+    resume_at = checkpoint.restore()
+    return channel, inventory, schedule, active_gems, checkpoint, resume_at
+
+
+def main():
+    """Main bot loop"""
+    channel, inventory, schedule, active_gems, checkpoint, resume_at = prepare()
+    if resume_at is not None:
+        take_break("resume_wait", int(resume_at - clock.now()))
+    run(channel, inventory, schedule, active_gems, checkpoint=checkpoint)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    except Exception:
+        log.exception("Bot stopped on an unexpected error")
+        raise
+    finally:
+        notify.shutdown()
+        METRICS.flush()
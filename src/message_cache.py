@@ -0,0 +1,189 @@
+"""
+Message cache module - shared snapshot of recent channel messages for all detectors
+"""
+from collections import deque
+
+import clock
+import metrics
+from parsed_message import ParsedMessage
+
+
+# How many messages the first read fetches (covers every detector's window)
+SNAPSHOT_LIMIT = 15
+
+# Recent messages kept in memory for detectors to query
+BUFFER_SIZE = 50
+
+# Discord's cap on messages returned by one GET
+FETCH_CAP = 100
+
+# Seconds a snapshot stays fresh before the next read refetches it
+SNAPSHOT_MAX_AGE = 5
+
+# Reply polling: first interval, growth factor, interval cap and overall deadline (seconds)
+REPLY_POLL_FIRST = 0.25
+REPLY_POLL_FACTOR = 2
+REPLY_POLL_MAX = 2
+REPLY_TIMEOUT = 10
+
+
+def posted_message_id(response):
+    """Return the ID of the message created by a POST, or None if it failed"""
+    if response is None or response.status_code != 200:
+        return None
+    try:
+        return response.json().get("id")
+    except ValueError:
+        return None
+
+
+class ChannelSnapshot:
+    """Short-lived cache over the channel messages endpoint.
+
+    One GET fills the snapshot and every detector reads from it until it goes
+    stale (older than ``max_age``) or is invalidated by posting a command.
+
+    After the first read, refreshes only ask for messages newer than the last
+    seen ID (``after=``) and append them to a bounded ring buffer, so each
+    poll downloads just what changed. Edits to already-seen messages are not
+    picked up by incremental reads.
+
+    Each fetched message is wrapped once in a ParsedMessage, which is what
+    detectors read. An optional ``recorder`` (recorder.MessageRecorder)
+    receives every raw batch fetched, for building replay fixtures.
+    """
+
+    def __init__(self, client, limit=SNAPSHOT_LIMIT, max_age=SNAPSHOT_MAX_AGE,
+                 buffer_size=BUFFER_SIZE, recorder=None):
+        self.client = client
+        self.recorder = recorder
+        self.limit = limit
+        self.max_age = max_age
+        self.status_code = None
+        self.error_text = None
+        self.last_seen_id = None
+        self._buffer = deque(maxlen=buffer_size)  # oldest -> newest
+        self._messages = []  # newest first, rebuilt when the buffer changes
+        self._fetched_at = None
+
+    def is_fresh(self):
+        """Return True if the cached messages can still be served"""
+        if self._fetched_at is None:
+            return False
+        return clock.now() - self._fetched_at < self.max_age
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next read refetches"""
+        self._fetched_at = None
+
+    def refresh(self):
+        """Fetch messages newer than the cursor and add them to the buffer"""
+        while not self.apply(self.client.get_messages(**self.fetch_params())):
+            pass
+        return self._messages
+
+    def fetch_params(self):
+        """get_messages arguments for the next read: the newest page, or everything after the cursor"""
+        if self.last_seen_id is None:
+            return {"limit": self.limit}
+        return {"limit": FETCH_CAP, "after": self.last_seen_id}
+
+    def apply(self, response):
+        """Fold a get_messages response into the snapshot.
+
+        Returns False if the page was full, so the gap can't be filled
+        incrementally: the snapshot is reset and the caller must fetch again.
+        """
+        self.status_code = response.status_code
+        if response.status_code == 200:
+            self.error_text = None
+            batch = response.json()
+            if self.last_seen_id is not None and len(batch) >= FETCH_CAP:
+                # Too far behind to fill the gap incrementally; reseed from newest
+                self.reset()
+                return False
+            self._add(batch)
+            if self.recorder is not None:
+                self.recorder.record(batch)
+        else:
+            self.error_text = response.text
+        # Errors are cached too so detectors don't each retry the same read
+        self._fetched_at = clock.now()
+        return True
+
+    def reset(self):
+        """Drop the buffer and cursor so the next read starts from the newest messages"""
+        self._buffer.clear()
+        self._messages = []
+        self.last_seen_id = None
+        self._fetched_at = None
+
+    def _add(self, batch):
+        if not batch:
+            return
+        # Snowflake IDs grow over time; sort so buffer order never depends on API order
+        batch = sorted((ParsedMessage(msg) for msg in batch), key=lambda msg: msg.snowflake)
+        if self.last_seen_id is not None:
+            cursor = int(self.last_seen_id)
+            batch = [msg for msg in batch if msg.snowflake > cursor]
+            if not batch:
+                return
+        self._buffer.extend(batch)
+        self.last_seen_id = batch[-1].id
+        self._messages = list(reversed(self._buffer))
+
+    def to_state(self, keep=SNAPSHOT_LIMIT):
+        """Checkpoint data: the cursor and the newest ``keep`` buffered messages"""
+        return {
+            "last_seen_id": self.last_seen_id,
+            "messages": [msg.raw for msg in list(self._buffer)[-keep:]],
+        }
+
+    def restore(self, state):
+        """Resume from checkpoint data; the next refresh only fetches newer messages"""
+        self.reset()
+        self._buffer.extend(ParsedMessage(msg) for msg in state.get("messages", ()))
+        self._messages = list(reversed(self._buffer))
+        self.last_seen_id = state.get("last_seen_id")
+
+    def messages(self, limit=None):
+        """Return buffered ParsedMessages (newest first), refetching if stale"""
+        if not self.is_fresh():
+            self.refresh()
+        return self.cached(limit)
+
+    def cached(self, limit=None):
+        """Return buffered ParsedMessages (newest first) without fetching"""
+        if limit is None:
+            return self._messages
+        return self._messages[:limit]
+
+    def send_message(self, content):
+        """Post a command and invalidate, since the channel just changed"""
+        response = self.client.send_message(content)
+        self.invalidate()
+        return response
+
+    def wait_for_reply(self, after_id, predicate=None, timeout=REPLY_TIMEOUT):
+        """Poll until a bot message newer than after_id shows up, or the deadline passes.
+
+        Polls start fast and back off (REPLY_POLL_FIRST, growing by
+        REPLY_POLL_FACTOR up to REPLY_POLL_MAX), so a quick reply is returned
+        as soon as it lands instead of after a fixed sleep. ``predicate``
+        narrows which bot message counts as the reply. Returns None on timeout.
+        """
+        after = int(after_id)
+        deadline = clock.now() + timeout
+        interval = REPLY_POLL_FIRST
+        while True:
+            metrics.sleep("reply_wait", min(interval, max(0, deadline - clock.now())))
+            self.refresh()
+            # Oldest first, so the earliest matching reply wins
+            for msg in reversed(self._messages):
+                if msg.snowflake <= after or not msg.author_bot:
+                    continue
+                if predicate is None or predicate(msg):
+                    return msg
+            if clock.now() >= deadline:
+                return None
+            interval = min(interval * REPLY_POLL_FACTOR, REPLY_POLL_MAX)
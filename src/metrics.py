@@ -0,0 +1,205 @@
+"""
+Metrics module - request, timing and sleep instrumentation with periodic file output
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import clock
+import log
+
+
+# JSON-lines snapshot file (empty to disable) and optional Prometheus text file
+METRICS_FILE = "metrics.jsonl"
+METRICS_PROM_FILE = ""
+
+# Seconds between periodic snapshots
+METRICS_INTERVAL = 60
+
+# Request latency histogram bucket bounds (in seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Current operation label; a context variable so asyncio tasks and worker threads each keep their own
+_ENDPOINT = ContextVar("metrics_endpoint", default=None)
+
+
+class Metrics:
+    """In-memory counters for one bot run.
+
+    Requests are grouped by endpoint (send, captcha_check, gem_check,
+    inventory) with a latency histogram each; HTTP statuses are counted across
+    all requests; ``timed`` sections record parse/normalize time per detector;
+    sleeps are totalled per category so active time is wall time minus sleep.
+    """
+
+    def __init__(self, clock=clock.now, path=METRICS_FILE, prom_path=METRICS_PROM_FILE,
+                 interval=METRICS_INTERVAL):
+        self.clock = clock
+        self.configure(path, prom_path, interval)
+        self.reset()
+
+    def configure(self, path=None, prom_path=None, interval=None):
+        """Set the output files and flush interval (None keeps the current value)"""
+        if path is not None:
+            self.path = path
+        if prom_path is not None:
+            self.prom_path = prom_path
+        if interval is not None:
+            self.interval = interval
+
+    def reset(self):
+        """Zero every counter and restart uptime from now (e.g. after swapping clocks)"""
+        self.started_at = self.clock()
+        self.requests = {}  # endpoint -> {"count", "sum", "buckets"}
+        self.statuses = {}  # status code -> count
+        self.timings = {}  # name -> {"count", "sum", "max"}
+        self.failures = {}  # endpoint -> {"timeouts", "retries", "failures"}
+        self.sleeps = {}  # category -> seconds
+        self._last_flush = self.started_at
+
+    def record_request(self, endpoint, status_code, seconds):
+        entry = self.requests.get(endpoint)
+        if entry is None:
+            entry = self.requests[endpoint] = {"count": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+        entry["count"] += 1
+        entry["sum"] += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                entry["buckets"][index] += 1
+        self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+
+    def record_failure(self, endpoint, kind):
+        """Count a timeout, a retry, or a request that failed for good"""
+        entry = self.failures.get(endpoint)
+        if entry is None:
+            entry = self.failures[endpoint] = {"timeouts": 0, "retries": 0, "failures": 0}
+        entry[kind] += 1
+
+    def record_timing(self, name, seconds):
+        entry = self.timings.get(name)
+        if entry is None:
+            entry = self.timings[name] = {"count": 0, "sum": 0.0, "max": 0.0}
+        entry["count"] += 1
+        entry["sum"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+
+    def record_sleep(self, category, seconds):
+        self.sleeps[category] = self.sleeps.get(category, 0.0) + seconds
+
+    @property
+    def endpoint(self):
+        """Endpoint label for requests made right now (None outside an ``operation``)"""
+        return _ENDPOINT.get()
+
+    def snapshot(self):
+        """Return all counters as a JSON-serializable dict"""
+        uptime = self.clock() - self.started_at
+        sleeping = sum(self.sleeps.values())
+        return {
+            "ts": round(time.time(), 3),
+            "uptime_seconds": round(uptime, 3),
+            "active_seconds": round(max(0.0, uptime - sleeping), 3),
+            "sleep_seconds": {name: round(value, 3) for name, value in self.sleeps.items()},
+            "requests": {
+                name: {
+                    "count": entry["count"],
+                    "sum_seconds": round(entry["sum"], 4),
+                    "buckets": dict(zip((str(bound) for bound in LATENCY_BUCKETS), entry["buckets"])),
+                }
+                for name, entry in self.requests.items()
+            },
+            "status_codes": {str(code): count for code, count in self.statuses.items()},
+            "request_failures": {name: dict(entry) for name, entry in self.failures.items()},
+            "timings": {
+                name: {"count": entry["count"], "sum_seconds": round(entry["sum"], 6),
+                       "max_seconds": round(entry["max"], 6)}
+                for name, entry in self.timings.items()
+            },
+        }
+
+    def prometheus_text(self):
+        """Render counters in the Prometheus text exposition format"""
+        lines = [
+            "# TYPE owo_request_duration_seconds histogram",
+        ]
+        for name, entry in self.requests.items():
+            for bound, count in zip(LATENCY_BUCKETS, entry["buckets"]):
+                lines.append(f'owo_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {count}')
+            lines.append(f'owo_request_duration_seconds_bucket{{endpoint="{name}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'owo_request_duration_seconds_sum{{endpoint="{name}"}} {entry["sum"]:.6f}')
+            lines.append(f'owo_request_duration_seconds_count{{endpoint="{name}"}} {entry["count"]}')
+        lines.append("# TYPE owo_http_responses_total counter")
+        for code, count in self.statuses.items():
+            lines.append(f'owo_http_responses_total{{status="{code}"}} {count}')
+        lines.append("# TYPE owo_request_failures_total counter")
+        for name, entry in self.failures.items():
+            for kind, count in entry.items():
+                lines.append(f'owo_request_failures_total{{endpoint="{name}",kind="{kind}"}} {count}')
+        lines.append("# TYPE owo_processing_seconds summary")
+        for name, entry in self.timings.items():
+            lines.append(f'owo_processing_seconds_sum{{section="{name}"}} {entry["sum"]:.6f}')
+            lines.append(f'owo_processing_seconds_count{{section="{name}"}} {entry["count"]}')
+        lines.append("# TYPE owo_sleep_seconds_total counter")
+        for category, seconds in self.sleeps.items():
+            lines.append(f'owo_sleep_seconds_total{{category="{category}"}} {seconds:.3f}')
+        snapshot = self.snapshot()
+        lines.append("# TYPE owo_active_seconds_total counter")
+        lines.append(f"owo_active_seconds_total {snapshot['active_seconds']}")
+        lines.append("# TYPE owo_uptime_seconds counter")
+        lines.append(f"owo_uptime_seconds {snapshot['uptime_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, path=None, prom_path=None):
+        """Append a snapshot to the JSON-lines file and rewrite the Prometheus file"""
+        path = self.path if path is None else path
+        prom_path = self.prom_path if prom_path is None else prom_path
+        self._last_flush = self.clock()
+        try:
+            if path:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.snapshot()) + "\n")
+            if prom_path:
+                tmp_path = prom_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.prometheus_text())
+                os.replace(tmp_path, prom_path)
+        except OSError as e:
+            log.warning("⚠️  Error writing metrics: %s", e)
+
+    def maybe_flush(self):
+        """Flush if the flush interval has passed since the last flush"""
+        if self.clock() - self._last_flush >= self.interval:
+            self.flush()
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def operation(endpoint):
+    """Label every request made inside the block with endpoint"""
+    token = _ENDPOINT.set(endpoint)
+    try:
+        yield
+    finally:
+        _ENDPOINT.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Record how long the block takes under name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.record_timing(name, time.perf_counter() - start)
+
+
+def sleep(category, seconds):
+    """Sleep on the installed clock, accounted to a sleep category"""
+    start = METRICS.clock()
+    clock.sleep(seconds)
+    METRICS.record_sleep(category, METRICS.clock() - start)
+    METRICS.maybe_flush()
@@ -0,0 +1,194 @@
+"""
+Notify module - sends alerts from a background worker through pluggable backends
+(sound, desktop, webhook, file), debounced so repeated detections alert once
+"""
+import importlib.util
+import json
+import queue
+import threading
+import time
+
+import clock
+import log
+
+
+# Backends to try, in order; each is skipped if unavailable or unconfigured
+NOTIFY_BACKENDS = ("sound", "desktop", "webhook", "file")
+
+# POST alerts as JSON to this URL, e.g. a local Home Assistant / ntfy endpoint (empty to disable)
+NOTIFY_WEBHOOK_URL = ""
+
+# Append alerts as JSON lines to this file (empty to disable)
+NOTIFY_FILE = ""
+
+# The same alert is not repeated within this many seconds
+NOTIFY_DEBOUNCE = 600
+
+# Seconds a webhook call may take
+NOTIFY_TIMEOUT = 5
+
+
+class SoundBackend:
+    """Three beeps via winsound (Windows only)"""
+
+    name = "sound"
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec("winsound") is not None
+
+    def send(self, title, message):
+        import winsound
+        for _ in range(3):
+            winsound.Beep(1000, 500)  # 1000 Hz for 500ms
+            time.sleep(0.3)
+
+
+class DesktopBackend:
+    """Desktop notification via plyer"""
+
+    name = "desktop"
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec("plyer") is not None
+
+    def send(self, title, message):
+        from plyer import notification
+        notification.notify(title=title, message=message, app_name='OwO Bot', timeout=10)
+
+
+class WebhookBackend:
+    """POSTs {"title", "message"} as JSON to a URL"""
+
+    name = "webhook"
+
+    def __init__(self, url=NOTIFY_WEBHOOK_URL):
+        self.url = url
+
+    def available(self):
+        return bool(self.url)
+
+    def send(self, title, message):
+        import requests
+        response = requests.post(self.url, json={"title": title, "message": message}, timeout=NOTIFY_TIMEOUT)
+        response.raise_for_status()
+
+
+class FileBackend:
+    """Appends {"time", "title", "message"} JSON lines to a file"""
+
+    name = "file"
+
+    def __init__(self, path=NOTIFY_FILE):
+        self.path = path
+
+    def available(self):
+        return bool(self.path)
+
+    def send(self, title, message):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), "title": title, "message": message},
+                               ensure_ascii=False) + "\n")
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (SoundBackend, DesktopBackend, WebhookBackend, FileBackend)
+}
+
+
+def create_backends(names=NOTIFY_BACKENDS, webhook_url=NOTIFY_WEBHOOK_URL, path=NOTIFY_FILE):
+    """Instantiate the named backends that are available here"""
+    options = {"webhook": {"url": webhook_url}, "file": {"path": path}}
+    backends = []
+    for name in names:
+        backend_class = BACKENDS.get(name)
+        if backend_class is None:
+            log.warning("Unknown notification backend: %s", name)
+            continue
+        backend = backend_class(**options.get(name, {}))
+        if backend.available():
+            backends.append(backend)
+    return backends
+
+
+class NotificationDispatcher:
+    """Delivers alerts on a daemon thread so callers never wait on sound or I/O.
+
+    ``notify`` drops an alert whose key was already sent within ``debounce``
+    seconds; ``clear`` re-arms a key (e.g. once a captcha is solved). A
+    failing backend is logged and does not stop the others.
+    """
+
+    def __init__(self, backends, debounce=NOTIFY_DEBOUNCE):
+        self.backends = list(backends)
+        self.debounce = debounce
+        self._last_sent = {}  # key -> clock time
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def notify(self, key, title, message):
+        """Queue an alert; returns False if it was debounced"""
+        now = clock.now()
+        with self._lock:
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.debounce:
+                return False
+            self._last_sent[key] = now
+            if self.backends and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notify", daemon=True)
+                self._thread.start()
+        if self.backends:
+            self._queue.put((title, message))
+        return True
+
+    def clear(self, key):
+        """Let the next alert for key through immediately"""
+        with self._lock:
+            self._last_sent.pop(key, None)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            title, message = item
+            for backend in self.backends:
+                try:
+                    backend.send(title, message)
+                except Exception as e:
+                    log.warning("Notification backend %s failed: %s", backend.name, e)
+
+    def close(self, timeout=5):
+        """Deliver queued alerts (waiting at most timeout seconds) and stop the worker"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+
+_DISPATCHER = None
+
+
+def setup(names=NOTIFY_BACKENDS, webhook_url=NOTIFY_WEBHOOK_URL, path=NOTIFY_FILE, debounce=NOTIFY_DEBOUNCE):
+    """Build the process-wide dispatcher from the startup settings"""
+    global _DISPATCHER
+    shutdown()
+    _DISPATCHER = NotificationDispatcher(create_backends(names, webhook_url, path), debounce)
+    return _DISPATCHER
+
+
+def get_dispatcher():
+    """The process-wide dispatcher (default settings if setup() wasn't called)"""
+    if _DISPATCHER is None:
+        return setup()
+    return _DISPATCHER
+
+
+def shutdown(timeout=5):
+    """Flush and stop the process-wide dispatcher, if one was started"""
+    if _DISPATCHER is not None:
+        _DISPATCHER.close(timeout)
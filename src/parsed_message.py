@@ -0,0 +1,89 @@
+"""
+Parsed message module - one compact, pre-extracted view of a Discord message shared by all detectors
+"""
+import re
+import unicodedata
+
+
+_ZERO_WIDTH_RE = re.compile(r"[\u200b-\u200f\u2060\ufeff]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(value: str) -> str:
+    """Normalize text to improve keyword matching across obfuscated messages."""
+    if not value:
+        return ""
+    # ASCII has no combining marks or zero-width chars, so skip the Unicode work
+    if not value.isascii():
+        # Unicode normalize and strip combining marks
+        normalized = unicodedata.normalize("NFKD", value)
+        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+        # Remove zero-width chars
+        value = _ZERO_WIDTH_RE.sub("", normalized)
+    # Collapse whitespace
+    value = _WHITESPACE_RE.sub(" ", value)
+    return value.lower().strip()
+
+
+class Embed:
+    """The text parts of one embed"""
+
+    __slots__ = ("title", "description", "fields", "author")
+
+    def __init__(self, embed):
+        self.title = embed.get('title') or ''
+        self.description = embed.get('description') or ''
+        self.fields = tuple(
+            (field.get('name') or '', field.get('value') or '') for field in embed.get('fields') or ()
+        )
+        self.author = (embed.get('author') or {}).get('name') or ''
+
+
+class ParsedMessage:
+    """A fetched message, walked once.
+
+    ``raw_text`` joins content, embed descriptions, titles, fields and author
+    names; ``lower`` and ``text`` (normalized part by part, for keyword
+    matching) are derived on first use and then cached. ``raw`` keeps the original
+    payload for recording and checkpoints.
+    """
+
+    __slots__ = ("id", "snowflake", "edited_timestamp", "author_bot", "content", "embeds",
+                 "parts", "raw_text", "raw", "_lower", "_text")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.id = raw.get('id')
+        self.snowflake = int(self.id) if self.id is not None else 0
+        self.edited_timestamp = raw.get('edited_timestamp')
+        self.author_bot = bool((raw.get('author') or {}).get('bot'))
+        self.content = raw.get('content') or ''
+        self.embeds = tuple(Embed(embed) for embed in raw.get('embeds') or ())
+
+        parts = [self.content]
+        for embed in self.embeds:
+            parts.append(embed.description)
+            parts.append(embed.title)
+            for name, value in embed.fields:
+                parts.append(name)
+                parts.append(value)
+            parts.append(embed.author)
+        self.parts = tuple(part for part in parts if part)
+        self.raw_text = " ".join(self.parts)
+        self._lower = None
+        self._text = None
+
+    @property
+    def lower(self):
+        """raw_text lowercased, for cheap substring checks"""
+        if self._lower is None:
+            self._lower = self.raw_text.lower()
+        return self._lower
+
+    @property
+    def text(self):
+        """raw_text normalized (see normalize_text), for keyword matching"""
+        if self._text is None:
+            # Per part, so the ASCII fast path still applies next to an emoji title
+            self._text = " ".join(filter(None, map(normalize_text, self.parts)))
+        return self._text
@@ -0,0 +1,99 @@
+"""
+Rate limit module - dispatches Discord requests within the API's per-route buckets
+"""
+import clock
+import log
+
+
+# How many times a request rejected with 429 is retried before giving up
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Fallback wait when a 429 carries no usable Retry-After (in seconds)
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def _header_float(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Tracks Discord rate limit buckets and delays requests that would be rejected.
+
+    Each route ("GET messages", "POST messages") maps to the bucket Discord
+    reports in ``X-RateLimit-Bucket``. When a bucket has no requests left the
+    next request sleeps until ``X-RateLimit-Reset-After`` has elapsed instead of
+    being sent and rejected. A 429 is retried after ``Retry-After``; a global
+    429 blocks every route.
+    """
+
+    def __init__(self, max_retries=MAX_RATE_LIMIT_RETRIES, sleep=clock.sleep, clock=clock.now):
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.clock = clock
+        self._route_buckets = {}  # route -> bucket id
+        self._buckets = {}  # bucket id -> (remaining, reset_at)
+        self._global_reset_at = 0.0
+
+    def delay_for(self, route):
+        """Seconds to wait before a request on route can be sent"""
+        now = self.clock()
+        delay = max(0.0, self._global_reset_at - now)
+        bucket = self._buckets.get(self._route_buckets.get(route, route))
+        if bucket is not None:
+            remaining, reset_at = bucket
+            if remaining <= 0 and reset_at > now:
+                delay = max(delay, reset_at - now)
+        return delay
+
+    def update(self, route, response):
+        """Record the bucket state reported by a response"""
+        headers = response.headers
+        bucket_id = headers.get("X-RateLimit-Bucket")
+        if bucket_id:
+            self._route_buckets[route] = bucket_id
+        key = self._route_buckets.get(route, route)
+
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        reset_after = _header_float(headers, "X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            self._buckets[key] = (remaining, self.clock() + reset_after)
+
+        if response.status_code == 429:
+            retry_after = self._retry_after(response)
+            reset_at = self.clock() + retry_after
+            if headers.get("X-RateLimit-Global", "").lower() == "true":
+                self._global_reset_at = max(self._global_reset_at, reset_at)
+            else:
+                self._buckets[key] = (0, reset_at)
+
+    def _retry_after(self, response):
+        retry_after = _header_float(response.headers, "Retry-After")
+        if retry_after is None:
+            try:
+                retry_after = float(response.json().get("retry_after"))
+            except (ValueError, TypeError, AttributeError):
+                retry_after = DEFAULT_RETRY_AFTER
+        return max(0.0, retry_after)
+
+    def send(self, route, do_request):
+        """Run do_request() for route within its bucket, retrying 429s.
+
+        Returns the last response, which is still a 429 if retries ran out.
+        """
+        attempts = 0
+        while True:
+            delay = self.delay_for(route)
+            if delay > 0:
+                self.sleep(delay)
+            response = do_request()
+            self.update(route, response)
+            if response.status_code != 429 or attempts >= self.max_retries:
+                return response
+            attempts += 1
+            log.warning("Rate limited on %s, retrying in %.2fs...", route, self.delay_for(route))
@@ -0,0 +1,98 @@
+"""
+Recorder module - saves channel message payloads to JSONL fixtures for offline replay
+
+Recording while the bot runs: set RECORD_MESSAGES=path/to/fixture.jsonl
+One-off dump of the newest messages: python src/recorder.py out.jsonl [limit]
+"""
+import json
+import os
+import sys
+
+import log
+
+
+# Fixture file that fetched messages are appended to while the bot runs (empty to disable)
+RECORD_MESSAGES = ""
+
+
+class MessageRecorder:
+    """Appends raw message payloads to a JSONL file, one message per line, oldest first.
+
+    Only messages newer than the last one written are recorded, so the
+    overlapping reads of a polling loop produce no duplicates.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.last_id = None
+        for msg in load_fixture(path) if os.path.exists(path) else ():
+            self._advance(msg["id"])
+
+    def _advance(self, message_id):
+        if self.last_id is None or int(message_id) > int(self.last_id):
+            self.last_id = message_id
+
+    def record(self, messages):
+        """Append any messages not recorded yet; returns how many were written"""
+        newer = sorted(
+            (msg for msg in messages if self.last_id is None or int(msg["id"]) > int(self.last_id)),
+            key=lambda msg: int(msg["id"]),
+        )
+        if not newer:
+            return 0
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for msg in newer:
+                    f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        except OSError as e:
+            log.warning("⚠️  Error recording messages: %s", e)
+            return 0
+        self._advance(newer[-1]["id"])
+        return len(newer)
+
+
+def load_fixture(path):
+    """Load a JSONL fixture as a list of messages, oldest first"""
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                messages.append(json.loads(line))
+    messages.sort(key=lambda msg: int(msg["id"]))
+    return messages
+
+
+def create_recorder(path=RECORD_MESSAGES):
+    """Return a MessageRecorder appending to path, or None when recording is off"""
+    if not path:
+        return None
+    log.info("✓ Recording channel messages to %s", path)
+    return MessageRecorder(path)
+
+
+def main(argv):
+    """Dump the newest channel messages to a fixture file"""
+    if not argv:
+        print("Usage: python src/recorder.py out.jsonl [limit]")
+        return 1
+    from initialization import ConfigError, load_config, create_client
+
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(f"ERROR: {e}")
+        return 1
+    limit = int(argv[1]) if len(argv) > 1 else 100
+    client = create_client(config)
+    response = client.get_messages(limit=limit)
+    if response.status_code != 200:
+        print(f"ERROR: Fetching messages failed with {response.status_code}: {response.text}")
+        return 1
+    written = MessageRecorder(argv[0]).record(response.json())
+    print(f"✓ Recorded {written} messages to {argv[0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,124 @@
+"""
+Retry policy module - per-operation timeouts, jittered retries and a circuit breaker
+for outbound Discord requests
+"""
+import random
+
+import requests
+
+import clock
+
+
+# Seconds to establish a connection / to wait for response data
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+
+# Retries after a 5xx or connection error, with full-jitter exponential backoff (in seconds)
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+
+# Server errors worth retrying; for POSTs only gateway errors, where the command never reached Discord
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+RETRY_STATUSES_UNSAFE = frozenset({502, 503, 504})
+
+# Consecutive failed requests that open the circuit, and how long it stays open
+# (doubling on each re-open up to BREAKER_COOLDOWN_MAX, in seconds)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+BREAKER_COOLDOWN_MAX = 60 * 15
+
+# Wait after an iteration aborted by a failed request while the circuit is still closed (in seconds)
+FAILED_ITERATION_WAIT = 30
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending while the circuit breaker is open"""
+
+
+class RequestPolicy:
+    """Timeouts and retry budget for one kind of operation"""
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, retry, rng=random):
+        """Seconds to wait before retry number `retry` (0-based), full jitter"""
+        return rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    def should_retry(self, method, response=None, error=None):
+        """Return True if a failed attempt may be sent again.
+
+        GETs are retried on any 5xx in RETRY_STATUSES, timeout or connection
+        error. POSTs aren't idempotent, so they are only retried when the
+        command can't have been delivered: a connect timeout or a gateway error.
+        """
+        safe = method == "GET"
+        if error is not None:
+            return safe or isinstance(error, requests.exceptions.ConnectTimeout)
+        return response.status_code in (RETRY_STATUSES if safe else RETRY_STATUSES_UNSAFE)
+
+
+def create_policies(connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+    """Per-operation policies keyed by metrics endpoint; "default" covers everything else"""
+    short_read = min(read_timeout, 10)
+    return {
+        "default": RequestPolicy(connect_timeout, read_timeout),
+        # Captcha checks run every iteration; fail fast and let the next one try again
+        "captcha_check": RequestPolicy(connect_timeout, short_read, max_retries=1),
+        "send": RequestPolicy(connect_timeout, short_read),
+    }
+
+
+POLICIES = create_policies()
+
+
+def policy_for(operation, policies=POLICIES):
+    return policies.get(operation) or policies["default"]
+
+
+class CircuitBreaker:
+    """Stops sending after repeated failures so the loop can pause instead of
+    spending iterations on a dead connection.
+
+    Opens after ``threshold`` consecutive failed requests (retries exhausted)
+    for ``cooldown`` seconds. The first request after that is a trial: success
+    closes the circuit, failure re-opens it for twice as long.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN,
+                 max_cooldown=BREAKER_COOLDOWN_MAX, clock=clock.now):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.failures = 0
+        self.cooldown = cooldown
+        self.open_until = None
+
+    def remaining(self):
+        """Seconds until the circuit lets a request through (0 if closed)"""
+        if self.open_until is None:
+            return 0.0
+        return max(0.0, self.open_until - self.clock())
+
+    def is_open(self):
+        return self.remaining() > 0
+
+    def record_success(self):
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.open_until = None
+
+    def record_failure(self):
+        """Count a failed request; returns True if this opened the circuit"""
+        self.failures += 1
+        if self.failures < self.threshold:
+            return False
+        self.open_until = self.clock() + self.cooldown
+        self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        return True
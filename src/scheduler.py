@@ -0,0 +1,67 @@
+"""
+Scheduler module - farming cadence: short/long breaks and iteration waits
+"""
+import random
+
+from initialization import (
+    ITERATION_WAIT_MIN, ITERATION_WAIT_MAX,
+    SHORT_BREAK_MIN, SHORT_BREAK_MAX,
+    LONG_BREAK_MIN, LONG_BREAK_MAX
+)
+
+
+# Messages counted per iteration, and how many trigger a short break
+MESSAGES_PER_ITERATION = 2
+MESSAGES_PER_SHORT_BREAK = 30
+
+# Iterations per cycle, and cycles per long break
+ITERATIONS_PER_CYCLE = 75
+CYCLES_PER_LONG_BREAK = 2
+
+
+class BreakSchedule:
+    """Decides how long to wait after each iteration.
+
+    Holds the loop's cadence counters (messages since the last short break,
+    iterations in the current cycle, completed cycles). ``rng`` makes the
+    random waits reproducible in simulations.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.message_count = 0
+        self.riel_count = 0
+        self.cnt = 0
+
+    def to_state(self):
+        return {"message_count": self.message_count, "riel_count": self.riel_count, "cnt": self.cnt}
+
+    def restore(self, state):
+        self.message_count = state.get("message_count", 0)
+        self.riel_count = state.get("riel_count", 0)
+        self.cnt = state.get("cnt", 0)
+
+    def finish_iteration(self):
+        """Advance the counters and return the waits to take, as [(category, seconds)]"""
+        self.message_count += MESSAGES_PER_ITERATION
+        self.riel_count += 1
+        waits = []
+
+        # Short break after every 30 messages
+        if self.message_count >= MESSAGES_PER_SHORT_BREAK:
+            waits.append(("short_break", self.rng.randint(SHORT_BREAK_MIN, SHORT_BREAK_MAX)))
+            self.message_count = 0
+
+        # After 75 iterations, count a cycle
+        if self.riel_count >= ITERATIONS_PER_CYCLE:
+            self.cnt += 1
+            self.riel_count = 0
+
+        # After 2 full cycles, take a longer break
+        if self.cnt >= CYCLES_PER_LONG_BREAK:
+            waits.append(("long_break", self.rng.randint(LONG_BREAK_MIN, LONG_BREAK_MAX)))
+            self.cnt = 0
+
+        # Random wait between iterations
+        waits.append(("iteration_wait", self.rng.randint(ITERATION_WAIT_MIN, ITERATION_WAIT_MAX)))
+        return waits